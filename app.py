@@ -1,39 +1,87 @@
 import csv
+import json
 import os
 from datetime import datetime
 
-import pandas as pd
-from flask import Flask, flash, redirect, render_template, request, session, url_for
+from flask import (
+    Flask,
+    Response,
+    flash,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    session,
+    url_for,
+)
 from openai import OpenAI
 
+from translation.cache import TranslationCache
+from translation.followup import (
+    ROLE_QUEUES,
+    ROLE_STAGES,
+    TRANSITIONS,
+    open_followup_store,
+)
 from translation.google_apis import (
     google_authenticate,
-    move_files_by_docid,
+    move_files_by_docids,
     save_df_to_gdrive,
 )
-from translation.translation import translate_csv_column
+from translation.jobs import JobQueue
+from translation.languages import language_label, language_name
+from translation.memory import TranslationMemory, format_reuse
+from translation.posts_store import PostStore
+from translation.rate_limit import get_governor
+from translation.storage import write_table
+from translation.telemetry import TelemetryStore, telemetry_run
+from translation.translation import (
+    stream_text_with_openai,
+    translate_csv_column_multi,
+)
 
 app = Flask(__name__)
 app.secret_key = "your_secret_key"
 
 # Chemin des fichiers CSV
 CSV_FILE = "./data/translation_followup_test.csv"
+FOLLOWUP_DB = "./data/translation_followup.sqlite"
 USERS_FILE = "./data/users.csv"
 CONTENT_FILE = "./data/posts.csv"
 
+# Nombre de traductions OpenAI lancées en parallèle
+TRANSLATION_MAX_WORKERS = int(os.getenv("TRANSLATION_MAX_WORKERS", "8"))
+
+# Regrouper les titres et textes courts dans une même requête (sortie JSON)
+TRANSLATION_PACK = os.getenv("TRANSLATION_PACK") == "1"
+
+# Cache des traductions déjà payées (même texte, langues, modèle et température)
+translation_cache = TranslationCache()
+
+# Mémoire de traduction (TRANSLATION_MEMORY=1) : paragraphes déjà traduits et relus
+# dans d'autres articles
+translation_memory = (
+    TranslationMemory() if os.getenv("TRANSLATION_MEMORY") == "1" else None
+)
+
 # Initialize the OpenAI API
 api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Les relances passent par le régulateur de débit partagé entre les workers
+client = OpenAI(api_key=api_key, max_retries=0 if get_governor() else 2)
 
 
-# Fonction pour charger les articles
-def load_articles():
-    return pd.read_csv(CSV_FILE)
+# Suivi des traductions (importé depuis CSV_FILE au premier lancement), avec
+# l'historique des changements de statut (qui, quoi, quand)
+followup_store = open_followup_store(FOLLOWUP_DB, CSV_FILE)
 
+# Contenu des articles indexé par id (synchronisé depuis CONTENT_FILE)
+post_store = PostStore()
 
-# Fonction pour sauvegarder les articles
-def save_articles(df):
-    df.to_csv(CSV_FILE, index=False)
+# Tâches de fond (traductions lancées depuis le dashboard)
+job_queue = JobQueue(max_workers=int(os.getenv("JOB_MAX_WORKERS", "2")))
+
+# Tokens, latence et coût de chaque appel OpenAI, par run et par utilisateur
+telemetry_store = TelemetryStore()
 
 
 # Fonction pour charger les utilisateurs
@@ -102,11 +150,47 @@ def admin_dashboard():
 @app.route("/select_language", methods=["GET", "POST"])
 def select_language():
     if request.method == "POST":
-        lang = request.form["language"]
-        session["lang"] = lang  # Enregistrer la langue choisie dans la session
+        # Une ou plusieurs langues cibles (suivies), traduites dans la même passe
+        langs = [
+            lang
+            for lang in request.form.getlist("languages")
+            if lang in followup_store.languages()
+        ]
+        if not langs:
+            return redirect(url_for("select_language"))
+        session["lang"] = langs[0]  # Enregistrer la langue choisie dans la session
+        session["langs"] = langs
         return redirect(url_for("translator_dashboard"))
 
-    return render_template("select_language.html")
+    return render_template(
+        "select_language.html",
+        languages=[(lang, language_label(lang)) for lang in followup_store.languages()],
+    )
+
+
+# Une page d'articles d'une étape (via l'index des statuts), avec la recherche
+# (?q=id ou titre), la page suivante (?after=dernier id) et les compteurs par étape
+def dashboard_page(langs, stage):
+    search = request.args.get("q", "").strip()
+    articles, next_after = followup_store.page(
+        langs, stage, after_id=request.args.get("after", type=int), search=search
+    )
+    return articles, {
+        "languages": langs,
+        "counts": followup_store.counts(langs),
+        "search": search,
+        "next_after": next_after,
+        "paginated": "after" in request.args,
+    }
+
+
+# Langues (parmi `langs`) dans lesquelles l'article reste à traduire
+def pending_languages(article, langs):
+    return [
+        lang
+        for lang in langs
+        if article["to_be_translated_" + lang] and not article["ai_translated_" + lang]
+    ]
 
 
 @app.route("/translator_dashboard", methods=["GET", "POST"])
@@ -115,76 +199,270 @@ def translator_dashboard():
     if "username" not in session or session["role"] not in ["admin", "translator"]:
         return redirect(url_for("login"))
 
-    # Charger les articles depuis le fichier CSV
-    articles_df = load_articles()
+    # Filtrer les articles en fonction des langues choisies
+    langs = session.get("langs") or [session.get("lang")]
 
-    # Filtrer les articles en fonction de la langue choisie
-    lang = session.get("lang")
-    print(lang)
-    ai_translated_column = "ai_translated_" + lang
-    to_translate_column = "to_be_translated_" + lang
-
-    # Sélectionner les articles qui n'ont pas encore été traduits et qui doivent être traduits
-    articles_to_translate = articles_df[
-        (articles_df[ai_translated_column] == False)
-        & (articles_df[to_translate_column] == True)
+    # Une page des articles qui n'ont pas encore été traduits et qui doivent être
+    # traduits dans au moins une des langues (triés par ID)
+    articles_to_translate, pagination = dashboard_page(langs, "to_translate")
+    articles_to_translate["languages"] = [
+        pending_languages(article, langs)
+        for _, article in articles_to_translate.iterrows()
     ]
 
-    # Ordonner les articles par ID
-    articles_to_translate = articles_to_translate.sort_values(by="id")
-
     if request.method == "POST":
         selected_articles = request.form.getlist("articles")
         selected_articles = list(map(int, selected_articles))
-        # Ici vous pouvez ajouter la logique pour traduire les articles sélectionnés
-        # Récupérer les articles sélectionnés et retrouver les contenus dans le fichier CSV
-        posts_df = pd.read_csv(CONTENT_FILE)
-        selected_posts = posts_df[posts_df["id"].isin(selected_articles)]
 
-        # Traduire les colonnes "title" et "content" du DataFrame
-        source_language_code = "fr"
-        target_language_code = lang
-        model_name = "gpt-4o"
+        # La traduction et l'export tournent en tâche de fond, la page suit la progression
+        job_id = job_queue.submit(
+            "translation",
+            session["username"],
+            translate_articles_job,
+            selected_articles,
+            langs,
+            session["username"],
+        )
+        flash("Traduction lancée en tâche de fond.", "info")
+        return redirect(url_for("translator_dashboard", job=job_id))
+
+    return render_template(
+        "translator_dashboard.html",
+        articles=articles_to_translate,
+        job_id=request.args.get("job"),
+        **pagination,
+    )
 
-        df_translated = translate_csv_column(
+
+# Tâche de fond : traduire les articles sélectionnés dans toutes les langues en une passe,
+# puis les exporter sur Google Drive
+def translate_articles_job(selected_articles, langs, username, progress):
+    if isinstance(langs, str):
+        langs = [langs]
+
+    # Récupérer les articles sélectionnés et retrouver les contenus
+    post_store.sync_file(CONTENT_FILE)
+    selected_posts = post_store.get_posts(selected_articles)
+
+    # Chaque article n'est traduit que dans les langues où il est attendu
+    followup = {
+        article["id"]: pending_languages(article, langs)
+        for article in map(followup_store.get, selected_articles)
+        if article is not None
+    }
+    row_languages = {
+        index: followup.get(article_id, [])
+        for index, article_id in selected_posts["id"].items()
+    }
+
+    # Traduire les colonnes "title" et "content" du DataFrame
+    source_language_code = "fr"
+    model_name = "gpt-4o"
+
+    with telemetry_run(telemetry_store, username, "dashboard") as run_id:
+        df_translated = translate_csv_column_multi(
             selected_posts,
             ["title", "content"],
             client,
             source_language_code,
-            target_language_code,
+            langs,
             model_name,
             temperature=0,
+            max_workers=TRANSLATION_MAX_WORKERS,
+            cache=translation_cache,
+            progress=lambda done, total: progress(done, total, "Traduction en cours"),
+            row_languages=row_languages,
+            pack=TRANSLATION_PACK,
+            memory=translation_memory,
         )
 
-        # Sauvegarder les traductions dans un fichier CSV avec nom unique
-        output_file = f"./data/posts_translated_{target_language_code}_{session['username']}_{datetime.now().strftime('%d%m%y_%H%M%S')}.csv"
-
-        # Changer la colonne "to_translate" à False pour les articles traduits dans le fichier CSV
-        articles_df.loc[
-            articles_df["id"].isin(selected_articles), to_translate_column
-        ] = False
-
-        # Change the "ai_translated" column to True for the translated articles in the CSV file
-        articles_df.loc[
-            articles_df["id"].isin(selected_articles), ai_translated_column
-        ] = True
+    # Sauvegarder les traductions dans un fichier CSV (ou parquet) avec nom unique
+    output_file = f"./data/posts_translated_{'_'.join(langs)}_{username}_{datetime.now().strftime('%d%m%y_%H%M%S')}.csv"
+    write_table(df_translated, output_file)
+
+    # Ne pas marquer comme traduits les articles dont une cellule a échoué dans la langue
+    errors = df_translated.attrs["translation_errors"]
+    failed_ids = set()
+    translated = {}
+    # Erreurs de chaque langue : une langue en échec n'empêche pas l'export des autres
+    lang_errors = {}
+    export_failed = False
+    creds = google_authenticate()
+    for lang in langs:
+        failed_rows = {index for index, _, error_lang in errors if error_lang == lang}
+        rows = [
+            index
+            for index in df_translated.index
+            if lang in row_languages[index] and index not in failed_rows
+        ]
+        lang_failed_ids = df_translated.loc[list(failed_rows), "id"].tolist()
+        failed_ids.update(lang_failed_ids)
+        if lang_failed_ids:
+            lang_errors.setdefault(lang, []).append(
+                f"traduction échouée pour les articles {sorted(lang_failed_ids)}"
+            )
+        if not rows:
+            continue
 
         # Sauvegarder les traductions dans google docs
+        progress(0, len(rows), f"Export vers Google Drive ({lang})")
         try:
-            creds = google_authenticate()
-            save_df_to_gdrive(creds, df_translated, lang)
+            save_df_to_gdrive(creds, df_translated.loc[rows], lang)
+        except Exception as e:
+            lang_errors.setdefault(lang, []).append(
+                f"export vers Google Drive échoué : {e}"
+            )
+            export_failed = True
+            continue
+        translated[lang] = df_translated.loc[rows, "id"].tolist()
+
+    if export_failed and not translated:
+        # Aucun export n'a réussi : la tâche échoue
+        raise RuntimeError(
+            " ; ".join(
+                f"{lang} : {message}"
+                for lang, messages in lang_errors.items()
+                for message in messages
+            )
+        )
 
-            flash("Traduction effectuée avec succès.", "success")
+    # Marquer les articles comme traduits une fois tous les exports terminés,
+    # seulement dans les langues où tout a réussi
+    for lang, article_ids in translated.items():
+        followup_store.bulk_update(
+            article_ids,
+            {"to_be_translated_" + lang: False, "ai_translated_" + lang: True},
+            actor=username,
+        )
+    progress(
+        len(df_translated), len(df_translated), "Traduction effectuée avec succès."
+    )
+    result = {
+        "translated": translated,
+        "failed": sorted(failed_ids),
+        "errors": lang_errors,
+        "run_id": run_id,
+    }
+    if translation_memory is not None:
+        # Part des articles reprise de la mémoire de traduction
+        result["memory"] = format_reuse(
+            translation_memory.reuse_report(df_translated["id"])
+        )
+    return result
 
-            # Sauvegarder le fichier CSV mis à jour
-            save_articles(articles_df)
 
-        except Exception as e:
-            flash(f"Erreur lors de la traduction : {str(e)}", "danger")
+# Progression d'une tâche de fond (interrogée par les dashboards)
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    if "username" not in session:
+        return jsonify({"error": "unauthorized"}), 401
+    job = job_queue.get(job_id)
+    if job is None or (
+        job["username"] != session["username"] and session["role"] != "admin"
+    ):
+        return jsonify({"error": "not found"}), 404
+    return jsonify(job)
+
+
+# Tâches récentes de l'utilisateur connecté
+@app.route("/jobs")
+def jobs():
+    if "username" not in session:
+        return jsonify({"error": "unauthorized"}), 401
+    return jsonify(job_queue.list(session["username"]))
 
+
+def sse_event(event, data) -> str:
+    # Un événement server-sent events, données en JSON
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# Traduction d'un article affichée au fur et à mesure (server-sent events)
+@app.route("/article/<int:article_id>/stream/<lang>")
+def article_stream(article_id, lang):
+    if "username" not in session or session["role"] not in ["admin", "translator"]:
+        return redirect(url_for("login"))
+    if lang not in followup_store.languages():
         return redirect(url_for("translator_dashboard"))
+    return render_template("article_stream.html", article_id=article_id, lang=lang)
+
+
+@app.route("/article/<int:article_id>/stream/<lang>/events")
+def article_stream_events(article_id, lang):
+    if "username" not in session or session["role"] not in ["admin", "translator"]:
+        return jsonify({"error": "unauthorized"}), 401
+    post_store.sync_file(CONTENT_FILE)
+    posts = post_store.get_posts([article_id])
+    if posts.empty or lang not in followup_store.languages():
+        return jsonify({"error": "not found"}), 404
+    post = posts.iloc[0]
+    username = session["username"]
+
+    # Chaque morceau terminé est écrit dans le fichier au fil de l'eau
+    output_file = f"./data/posts_translated_{lang}_{article_id}_{username}_{datetime.now().strftime('%d%m%y_%H%M%S')}.html"
+
+    def events():
+        with (
+            telemetry_run(telemetry_store, username, "stream"),
+            open(output_file, "w", encoding="utf-8") as output,
+        ):
+            try:
+                for field in ("title", "content"):
+                    yield sse_event("field", field)
+                    for text in stream_text_with_openai(
+                        post[field],
+                        client,
+                        "fr",
+                        lang,
+                        "gpt-4o",
+                        temperature=0,
+                        cache=translation_cache,
+                        article_id=article_id,
+                        output=output,
+                    ):
+                        yield sse_event("delta", {"field": field, "text": text})
+                    output.write("\n")
+            except Exception as e:
+                yield sse_event("error", str(e))
+                return
+        yield sse_event("done", {"output_file": os.path.basename(output_file)})
+
+    # Pas de mise en tampon par un proxy (nginx) entre le serveur et le navigateur
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    return render_template("translator_dashboard.html", articles=articles_to_translate)
+
+# Historique des changements de statut d'un article
+@app.route("/article/<int:article_id>/history")
+def article_history(article_id):
+    if "username" not in session:
+        return jsonify({"error": "unauthorized"}), 401
+    return jsonify(followup_store.history(article_id))
+
+
+# Tokens, latence et coût des traductions : par run et par utilisateur
+@app.route("/metrics")
+def metrics():
+    if "username" not in session:
+        return jsonify({"error": "unauthorized"}), 401
+    # Un admin voit tous les utilisateurs, les autres seulement leurs runs
+    if session["role"] == "admin":
+        usernames = telemetry_store.usernames()
+        runs = telemetry_store.runs(limit=request.args.get("limit", 20, type=int))
+    else:
+        usernames = [session["username"]]
+        runs = telemetry_store.runs(
+            session["username"], limit=request.args.get("limit", 20, type=int)
+        )
+    return jsonify(
+        {
+            "users": [telemetry_store.user_summary(username) for username in usernames],
+            "runs": runs,
+        }
+    )
 
 
 @app.route("/reviewer_dashboard", methods=["GET", "POST"])
@@ -193,42 +471,55 @@ def reviewer_dashboard():
     if "username" not in session or session["role"] not in ["admin", "reviewer"]:
         return redirect(url_for("login"))
 
-    # Charger les articles depuis le fichier .csv
-    articles_df = load_articles()
-
     # Filtrer les articles en fonction de la langue choisie
     lang = session.get("lang")
-    ai_translated_column = "ai_translated_" + lang
     translation_reviewed_column = "translation_reviewed_" + lang
 
-    # Sélectionner les articles déja traduits par IA par encore reviewé
-    articles_to_review = articles_df[
-        (articles_df[ai_translated_column] == True)
-        & (articles_df[translation_reviewed_column] == False)
-    ]
-
-    # Ordonner les articles par ID
-    articles_to_review = articles_to_review.sort_values(by="id")
+    # Une page des articles déja traduits par IA par encore reviewés (triés par ID)
+    articles_to_review, pagination = dashboard_page([lang], "to_review")
 
     if request.method == "POST":
         selected_articles = request.form.getlist("articles")
         selected_articles = list(map(int, selected_articles))
 
         try:
+            # Déplacer tous les documents sélectionnés en une fois (requêtes batch)
             creds = google_authenticate()
-            for docid in selected_articles:
-                move_files_by_docid(creds, docid, lang)
-
-            flash("Review validée et documents déplacés.", "success")
-
-            # Sauvegarder le fichier CSV mis à jour
-            save_articles(articles_df)
+            results = move_files_by_docids(creds, selected_articles, lang)
+            moved = [
+                docid for docid in selected_articles if not results[docid]["errors"]
+            ]
+            failed = {
+                docid: results[docid]["errors"]
+                for docid in selected_articles
+                if results[docid]["errors"]
+            }
+
+            if moved:
+                flash("Review validée et documents déplacés.", "success")
+            for docid, errors in failed.items():
+                flash(f"Article {docid} : {' ; '.join(errors)}", "danger")
+
+            # Marquer comme relus les articles dont tous les documents ont été déplacés
+            followup_store.bulk_update(
+                moved,
+                {
+                    translation_reviewed_column: True,
+                    "translation_reviewed_by_" + lang: session["username"],
+                },
+                actor=session["username"],
+            )
+            # Les traductions relues deviennent réutilisables par la mémoire
+            if translation_memory is not None:
+                translation_memory.approve(moved, lang)
 
         except Exception as e:
             flash(f"Erreur lors du déplacement des documents : {str(e)}", "danger")
 
         return redirect(url_for("reviewer_dashboard"))
-    return render_template("reviewer_dashboard.html", articles=articles_to_review)
+    return render_template(
+        "reviewer_dashboard.html", articles=articles_to_review, **pagination
+    )
 
 
 @app.route("/approver_dashboard", methods=["GET", "POST"])
@@ -237,6 +528,54 @@ def approver_dashboard():
     pass
 
 
+# Transition du workflow appliquée par chaque rôle depuis le tableau de bord
+ROLE_TRANSITIONS = {role: transition for transition, role in TRANSITIONS.items()}
+
+
+# Appliquer une transition à une liste d'articles en une transaction (import des
+# décisions depuis un tableur) : {"transition": "reviewed", "lang": "es", "ids": [...]}
+@app.route("/api/transitions", methods=["POST"])
+def api_transitions():
+    if "username" not in session:
+        return jsonify({"error": "unauthorized"}), 401
+    payload = request.get_json(silent=True) or {}
+    transition = payload.get("transition")
+    lang = payload.get("lang")
+    article_ids = payload.get("ids")
+    if not isinstance(article_ids, list):
+        return jsonify({"error": "ids must be a list of article ids"}), 400
+    try:
+        results = followup_store.apply_transition(
+            article_ids,
+            transition,
+            lang,
+            actor=session["username"],
+            role=session["role"],
+            languages=session.get("langs") or [session.get("lang")],
+        )
+    except PermissionError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    updated = [
+        article_id for article_id, result in results.items() if result == "updated"
+    ]
+    # Les traductions relues deviennent réutilisables par la mémoire
+    if transition == "reviewed" and translation_memory is not None:
+        translation_memory.approve(updated, lang)
+    return jsonify(
+        {
+            "transition": transition,
+            "lang": lang,
+            "updated": len(updated),
+            "results": {
+                str(article_id): result for article_id, result in results.items()
+            },
+        }
+    )
+
+
 # Tableau de bord : affichage de tous les articles
 # Tableau de bord : affichage des articles filtrés en fonction du rôle et de la langue
 @app.route("/dashboard", methods=["GET", "POST"])
@@ -244,89 +583,41 @@ def dashboard():
     if "username" not in session:
         return redirect(url_for("login"))
 
-    df = load_articles()
-
     # Filtrer les articles selon le rôle et la langue de l'utilisateur
     role = session["role"]
-    filtered_articles = None
-
-    if role == "translator":
-        if session["lang"] == "en":
-            filtered_articles = df[
-                df["ai_translated_en"] == False
-            ]  # Articles pas encore traduits en anglais
-        elif session["lang"] == "es":
-            filtered_articles = df[
-                df["ai_translated_es"] == False
-            ]  # Articles pas encore traduits en espagnol
-
-    elif role == "reviewer":
-        if session["lang"] == "en":
-            filtered_articles = df[
-                df["translation_reviewed_en"] == False
-            ]  # Articles pas encore révisés en anglais
-        elif session["lang"] == "es":
-            filtered_articles = df[
-                df["translation_reviewed_es"] == False
-            ]  # Articles pas encore révisés en espagnol
-
-    elif role == "approver":
-        if session["lang"] == "en":
-            filtered_articles = df[
-                df["approved_en"] == False
-            ]  # Articles pas encore approuvés en anglais
-        elif session["lang"] == "es":
-            filtered_articles = df[
-                df["approved_es"] == False
-            ]  # Articles pas encore approuvés en espagnol
+    lang = session["lang"]
+    transition = ROLE_TRANSITIONS.get(role)
+
+    # Une page des articles à traduire / réviser / approuver dans la langue,
+    # de tous les articles (dans toutes les langues) pour les autres rôles
+    filtered_articles, pagination = dashboard_page(
+        [lang] if role in ROLE_QUEUES else followup_store.languages(),
+        ROLE_QUEUES.get(role),
+    )
 
     # Si un formulaire POST a été soumis
-    if request.method == "POST":
+    if request.method == "POST" and transition is not None:
         selected_articles = request.form.getlist(
             "article_ids"
         )  # Obtenir les articles sélectionnés
-        for article_id in selected_articles:
-            article_id = int(article_id)
-
-            # Effectuer l'action en fonction du rôle
-            if role == "translator":
-                if session["lang"] == "en":
-                    df.loc[df["id"] == article_id, "ai_translated_en"] = True
-                elif session["lang"] == "es":
-                    df.loc[df["id"] == article_id, "ai_translated_es"] = True
-
-            elif role == "reviewer":
-                if session["lang"] == "en":
-                    df.loc[df["id"] == article_id, "translation_reviewed_en"] = True
-                    df.loc[df["id"] == article_id, "translation_reviewed_by_en"] = (
-                        session["username"]
-                    )
-                elif session["lang"] == "es":
-                    df.loc[df["id"] == article_id, "translation_reviewed_es"] = True
-                    df.loc[df["id"] == article_id, "translation_reviewed_by_es"] = (
-                        session["username"]
-                    )
-
-            elif role == "approver":
-                if session["lang"] == "en":
-                    df.loc[df["id"] == article_id, "approved_en"] = True
-                    df.loc[df["id"] == article_id, "approved_by_en"] = session[
-                        "username"
-                    ]
-                elif session["lang"] == "es":
-                    df.loc[df["id"] == article_id, "approved_es"] = True
-                    df.loc[df["id"] == article_id, "approved_by_es"] = session[
-                        "username"
-                    ]
-
-        # Sauvegarder les changements dans le CSV
-        save_articles(df)
-
-        flash("Les articles sélectionnés ont été mis à jour.")
+
+        # Effectuer l'action en fonction du rôle, en une seule transaction
+        results = followup_store.apply_transition(
+            selected_articles, transition, lang, actor=session["username"]
+        )
+        updated = [
+            article_id for article_id, result in results.items() if result == "updated"
+        ]
+        if transition == "reviewed" and translation_memory is not None:
+            translation_memory.approve(updated, lang)
+
+        flash(f"{len(updated)} article(s) sélectionné(s) mis à jour.")
         return redirect(url_for("dashboard"))
 
     return render_template(
-        "dashboard.html", articles=filtered_articles.to_dict(orient="records")
+        "dashboard.html",
+        articles=filtered_articles.to_dict(orient="records"),
+        **pagination,
     )
 
 
@@ -336,40 +627,37 @@ def article(article_id):
     if "username" not in session:
         return redirect(url_for("login"))
 
-    df = load_articles()
-    article = df[df["id"] == article_id].iloc[0]
+    article = followup_store.get(article_id)
+    if article is None:
+        return redirect(url_for("dashboard"))
 
     if request.method == "POST":
         role = session["role"]
         username = session["username"]
 
-        # Actions en fonction du rôle
-        if role == "translator":
-            if "translate_en" in request.form:
-                df.loc[df["id"] == article_id, "ai_translated_en"] = True
-            elif "translate_es" in request.form:
-                df.loc[df["id"] == article_id, "ai_translated_es"] = True
-
-        if role == "reviewer":
-            if "review_en" in request.form:
-                df.loc[df["id"] == article_id, "translation_reviewed_en"] = True
-                df.loc[df["id"] == article_id, "translation_reviewed_by_en"] = username
-            elif "review_es" in request.form:
-                df.loc[df["id"] == article_id, "translation_reviewed_es"] = True
-                df.loc[df["id"] == article_id, "translation_reviewed_by_es"] = username
-
-        if role == "approver":
-            if "approve_en" in request.form:
-                df.loc[df["id"] == article_id, "approved_en"] = True
-                df.loc[df["id"] == article_id, "approved_by_en"] = username
-            elif "approve_es" in request.form:
-                df.loc[df["id"] == article_id, "approved_es"] = True
-                df.loc[df["id"] == article_id, "approved_by_es"] = username
-
-        save_articles(df)
+        # Actions en fonction du rôle : bouton "<action>_<langue>"
+        actions = {
+            "translator": "translate",
+            "reviewer": "review",
+            "approver": "approve",
+        }
+        if role in actions:
+            stage, actor = ROLE_STAGES[role]
+            for lang in followup_store.languages():
+                if f"{actions[role]}_{lang}" in request.form:
+                    values = {f"{stage}_{lang}": True}
+                    if actor is not None:
+                        values[f"{actor}_{lang}"] = username
+                    followup_store.update(article_id, values, actor=username)
+                    break
+
         return redirect(url_for("dashboard"))
 
-    return render_template("article.html", article=article)
+    return render_template(
+        "article.html",
+        article=article,
+        languages=[(lang, language_name(lang)) for lang in followup_store.languages()],
+    )
 
 
 # Déconnexion
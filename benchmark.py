@@ -0,0 +1,461 @@
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.fakes import (
+    FakeCMS,
+    FakeDrive,
+    FakeOpenAI,
+    install_fake_drive,
+    make_corpus,
+    percentile,
+)
+from translation.database import get_posts_from_titles
+from translation.google_apis import (
+    get_review_folders,
+    move_files_by_docid,
+    move_files_by_docids,
+    save_df_to_gdrive,
+)
+from translation.rate_limit import RateGovernor, set_governor
+from translation.translation import translate_csv_column
+
+# Scenarios, in the order they run
+SCENARIOS = (
+    "translate",
+    "save_to_drive",
+    "move_by_docid",
+    "move_by_docids",
+    "get_posts",
+    "dashboard",
+)
+
+DEFAULT_BASELINE = "./benchmark_baseline.json"
+
+# Relative change above which a throughput drop or a p99 increase is a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def fake_kwargs(args, prefix):
+    return {
+        "latency": getattr(args, f"{prefix}_latency"),
+        "rate_limit": getattr(args, f"{prefix}_rate_limit"),
+        "error_rate": getattr(args, f"{prefix}_error_rate"),
+        "seed": args.seed,
+    }
+
+
+def summarize(items, duration, latencies, **extra) -> dict:
+    return {
+        "items": items,
+        "duration": duration,
+        "throughput": items / duration if duration else None,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "samples": len(latencies),
+        **extra,
+    }
+
+
+def translated_corpus(corpus, lang_code):
+    # Translated columns without calling the model, for the Drive scenarios
+    return corpus.assign(
+        **{
+            f"title_{lang_code}": "[es] " + corpus["title"],
+            f"content_{lang_code}": "[es] " + corpus["content"],
+        }
+    )
+
+
+def bench_translate(args, corpus):
+    client = FakeOpenAI(**fake_kwargs(args, "openai"))
+    # Fresh rate limit buckets for each run, as the fake's window is new, in a
+    # directory removed after the run
+    with tempfile.TemporaryDirectory(prefix="rate-limit-") as rate_limit_dir:
+        set_governor(
+            None
+            if args.no_governor
+            else RateGovernor(os.path.join(rate_limit_dir, "rate_limit.sqlite"))
+        )
+        try:
+            start = time.perf_counter()
+            df = translate_csv_column(
+                corpus,
+                ["title", "content"],
+                client,
+                "fr",
+                "es",
+                "gpt-4o",
+                temperature=0,
+                max_workers=args.workers,
+                pack=args.pack,
+            )
+            duration = time.perf_counter() - start
+        finally:
+            set_governor(None)
+    return summarize(
+        len(corpus),
+        duration,
+        client.latencies,
+        calls=client.calls,
+        errors=len(df.attrs["translation_errors"]),
+        rate_limited=client.rate_limited,
+    )
+
+
+def bench_save_to_drive(args, corpus):
+    drive = FakeDrive(**fake_kwargs(args, "drive"))
+    restore = install_fake_drive(drive)
+    try:
+        start = time.perf_counter()
+        save_df_to_gdrive(drive.credentials, translated_corpus(corpus, "es"), "es")
+        duration = time.perf_counter() - start
+    finally:
+        restore()
+    return summarize(len(corpus), duration, drive.latencies, calls=drive.calls)
+
+
+def _drive_with_review_docs(args, corpus):
+    # Two documents per article (original and translation) in the "to review" folder
+    drive = FakeDrive(**fake_kwargs(args, "drive"))
+    old_folder_id, _ = get_review_folders("es")
+    drive.add_files(
+        old_folder_id,
+        [
+            name
+            for post_id, title in zip(corpus["id"], corpus["title"])
+            for name in (f"{post_id}_{title}", f"{post_id}_[es] {title}")
+        ],
+    )
+    return drive
+
+
+def bench_move_by_docid(args, corpus):
+    drive = _drive_with_review_docs(args, corpus)
+    restore = install_fake_drive(drive)
+    try:
+        start = time.perf_counter()
+        for docid in corpus["id"]:
+            move_files_by_docid(drive.credentials, docid, "es")
+        duration = time.perf_counter() - start
+    finally:
+        restore()
+    return summarize(len(corpus), duration, drive.latencies, calls=drive.calls)
+
+
+def bench_move_by_docids(args, corpus):
+    drive = _drive_with_review_docs(args, corpus)
+    restore = install_fake_drive(drive)
+    try:
+        start = time.perf_counter()
+        results = move_files_by_docids(drive.credentials, corpus["id"].tolist(), "es")
+        duration = time.perf_counter() - start
+    finally:
+        restore()
+    errors = sum(bool(result["errors"]) for result in results.values())
+    return summarize(
+        len(corpus), duration, drive.latencies, calls=drive.calls, errors=errors
+    )
+
+
+def bench_get_posts(args, corpus):
+    cms = FakeCMS("./data/cms.sqlite", corpus, **fake_kwargs(args, "cms"))
+    restore = cms.install()
+    try:
+        start = time.perf_counter()
+        posts_df = get_posts_from_titles(corpus[["title"]])
+        duration = time.perf_counter() - start
+    finally:
+        restore()
+    return summarize(len(posts_df), duration, cms.latencies, calls=cms.calls)
+
+
+def write_app_data(corpus):
+    # Users and follow-up table expected by app.py, for the same articles
+    pd.DataFrame(
+        [
+            {"username": "translator", "role": "translator", "lang": "es"},
+            {"username": "reviewer", "role": "reviewer", "lang": "es"},
+            {"username": "admin", "role": "admin", "lang": "es"},
+        ]
+    ).to_csv("./data/users.csv", index=False)
+    followup = corpus[["id", "title"]].copy()
+    for lang in ("en", "es"):
+        followup[f"to_be_translated_{lang}"] = True
+        followup[f"ai_translated_{lang}"] = False
+        followup[f"translation_reviewed_{lang}"] = False
+        followup[f"approved_{lang}"] = False
+        followup[f"translation_reviewed_by_{lang}"] = None
+        followup[f"approved_by_{lang}"] = None
+    followup.to_csv("./data/translation_followup_test.csv", index=False)
+    corpus.to_csv("./data/posts.csv", index=False)
+
+
+def bench_dashboard(args, corpus):
+    # Each run starts from fresh stores (follow-up, cache, jobs...), so that
+    # every repeat translates and exports the same articles
+    workdir = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="dashboard-", dir=workdir))
+    try:
+        return run_dashboard(args, corpus)
+    finally:
+        os.chdir(workdir)
+
+
+def run_dashboard(args, corpus):
+    os.makedirs("./data", exist_ok=True)
+    write_app_data(corpus)
+    # app.py opens its stores in ./data when imported: import it again for
+    # the stores of this run
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    set_governor(None if args.no_governor else RateGovernor("./data/rate_limit.sqlite"))
+    if "app" in sys.modules:
+        dashboard_app = importlib.reload(sys.modules["app"])
+    else:
+        import app as dashboard_app
+
+    dashboard_app.client = FakeOpenAI(**fake_kwargs(args, "openai"))
+    drive = FakeDrive(**fake_kwargs(args, "drive"))
+    dashboard_app.google_authenticate = lambda: drive.credentials
+    restore = install_fake_drive(drive)
+    client = dashboard_app.app.test_client()
+    latencies = []
+    failed_requests = []
+
+    def timed(method, url, **kwargs):
+        request_start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        latencies.append(time.perf_counter() - request_start)
+        # An error page is fast: count it, it must not pass for a fast request
+        if response.status_code >= 400:
+            failed_requests.append(f"{method.upper()} {url}: {response.status_code}")
+        return response
+
+    try:
+        start = time.perf_counter()
+        for username, urls in (
+            ("translator", ["/translator_dashboard", "/dashboard"]),
+            ("reviewer", ["/reviewer_dashboard", "/dashboard"]),
+            ("admin", ["/dashboard"]),
+        ):
+            timed("post", "/", data={"username": username})
+            for _ in range(args.requests):
+                for url in urls:
+                    timed("get", url)
+
+        # One translation job, followed until it ends
+        timed("post", "/", data={"username": "translator"})
+        response = timed(
+            "post",
+            "/translator_dashboard",
+            data={"articles": [str(i) for i in corpus["id"][: args.job_articles]]},
+        )
+        job_id = response.location.split("job=")[1]
+        while True:
+            job = timed("get", f"/jobs/{job_id}").json
+            if job["status"] in ("succeeded", "failed"):
+                break
+            time.sleep(0.05)
+        duration = time.perf_counter() - start
+    finally:
+        restore()
+    for failed_request in failed_requests[:5]:
+        print(f"  {failed_request}")
+    return summarize(
+        len(latencies),
+        duration,
+        latencies,
+        errors=len(failed_requests),
+        job_status=job["status"],
+    )
+
+
+def compare(results, baseline, tolerance) -> list:
+    """Print the change of each scenario against the baseline, return the regressions."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None or "error" in result or "error" in reference:
+            continue
+        changes = []
+        if result.get("errors", 0) > reference.get("errors", 0):
+            regressions.append(
+                f"{name}: errors {reference.get('errors', 0)} -> {result['errors']}"
+            )
+        for metric, higher_is_better in (
+            ("throughput", True),
+            ("p50", False),
+            ("p99", False),
+        ):
+            old, new = reference.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            changes.append(f"{metric} {change:+.0%}")
+            worse = -change if higher_is_better else change
+            if metric != "p50" and worse > tolerance:
+                regressions.append(f"{name}: {metric} {old:.4g} -> {new:.4g}")
+        print(f"  {name:<16} " + ", ".join(changes))
+    return regressions
+
+
+def print_results(results):
+    print(
+        f"{'scenario':<16} {'items':>8} {'time (s)':>9} {'items/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9}"
+    )
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<16} failed: {result['error']}")
+            continue
+        p50 = f"{result['p50'] * 1000:.1f}" if result["p50"] is not None else "-"
+        p99 = f"{result['p99'] * 1000:.1f}" if result["p99"] is not None else "-"
+        throughput = f"{result['throughput']:.1f}" if result["throughput"] else "-"
+        print(
+            f"{name:<16} {result['items']:>8} {result['duration']:>9.2f} {throughput:>9} {p50:>9} {p99:>9}"
+        )
+
+
+def main(args):
+    corpus = make_corpus(args.articles, args.words, seed=args.seed)
+    print(
+        f"Corpus: {len(corpus)} articles, "
+        f"{int(corpus['content'].str.split().str.len().sum())} words"
+    )
+
+    results = {}
+    for name in args.scenarios:
+        runs = []
+        for _ in range(args.repeat):
+            try:
+                runs.append(BENCHMARKS[name](args, corpus))
+            except Exception as e:
+                runs = [{"error": f"{type(e).__name__}: {e}"}]
+                break
+        # Keep the median run (by duration)
+        runs.sort(key=lambda run: run.get("duration", 0))
+        results[name] = runs[len(runs) // 2]
+
+    print_results(results)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("baseline", "save_baseline")
+        },
+        "scenarios": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Warning: the baseline was measured with a different configuration.")
+        print(f"Compared to {args.baseline} ({baseline.get('created_at')}):")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+BENCHMARKS = {
+    "translate": bench_translate,
+    "save_to_drive": bench_save_to_drive,
+    "move_by_docid": bench_move_by_docid,
+    "move_by_docids": bench_move_by_docids,
+    "get_posts": bench_get_posts,
+    "dashboard": bench_dashboard,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the translation pipeline against local fakes of OpenAI, Drive and the CMS."
+    )
+    parser.add_argument(
+        "--articles",
+        type=int,
+        default=100,
+        help="Articles in the synthetic corpus (10 to 100k)",
+    )
+    parser.add_argument(
+        "--words", type=int, default=400, help="Mean number of words per article"
+    )
+    parser.add_argument(
+        "--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS)
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per scenario, the median is kept"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Concurrent OpenAI calls"
+    )
+    parser.add_argument(
+        "--no-governor",
+        action="store_true",
+        help="Call the fake OpenAI without the shared rate governor",
+    )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        help="Pack the short texts of the translate scenario in JSON requests",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=20, help="Requests per dashboard route"
+    )
+    parser.add_argument(
+        "--job-articles",
+        type=int,
+        default=10,
+        help="Articles of the dashboard translation job",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    for prefix, latency in (("openai", 0.5), ("drive", 0.1), ("cms", 0.02)):
+        parser.add_argument(
+            f"--{prefix}-latency", type=float, default=latency, help="Seconds per call"
+        )
+        parser.add_argument(
+            f"--{prefix}-rate-limit", type=int, default=None, help="Calls per minute"
+        )
+        parser.add_argument(f"--{prefix}-error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--workdir", help="Directory of the ./data files (a temporary one by default)"
+    )
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save the results as the new baseline",
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    # The baseline and output paths are relative to where the script is run
+    args.baseline = os.path.abspath(args.baseline)
+    args.output = os.path.abspath(args.output) if args.output else None
+
+    # The stores of the app write to ./data: run in a scratch directory
+    workdir = args.workdir or tempfile.mkdtemp(prefix="translation-benchmark-")
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    os.chdir(workdir)
+
+    sys.exit(main(args))
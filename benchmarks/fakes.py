@@ -0,0 +1,513 @@
+import itertools
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import httplib2
+import pandas as pd
+from googleapiclient.errors import HttpError
+
+from translation.drive_index import GOOGLE_DOC_MIMETYPE
+
+# Local stand-ins for OpenAI, Google Drive and the CMS database, used by
+# benchmark.py: latency, rate limit and error rate are configurable, and each
+# fake records the latency of the calls it answers.
+
+# Vocabulary of the synthetic articles
+WORDS = (
+    "santé sommeil alimentation enfant grossesse allaitement fièvre vaccin "
+    "croissance développement pédiatre conseil repas nuit bébé maman papa "
+    "semaine mois symptôme traitement médecin douleur eau lait jeu parole "
+    "marche dent peau allergie otite rhume toux respiration attention"
+).split()
+
+# Pieces of a streamed answer: a word and the whitespace after it
+STREAM_PIECE = re.compile(r"\s*\S+\s*")
+
+
+def make_corpus(n_articles, words_per_article=400, seed=0) -> pd.DataFrame:
+    """
+    Synthetic posts (id, title, content): HTML paragraphs of random words, the
+    length of each article varying around `words_per_article`.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for post_id in range(1, n_articles + 1):
+        n_words = max(20, int(rng.gauss(words_per_article, words_per_article / 3)))
+        paragraphs = []
+        while n_words > 0:
+            size = min(n_words, rng.randint(40, 120))
+            paragraphs.append(
+                "<p>" + " ".join(rng.choice(WORDS) for _ in range(size)) + "</p>"
+            )
+            n_words -= size
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8)))
+        rows.append(
+            {
+                "id": post_id,
+                "title": f"{title.capitalize()} {post_id}",
+                "content": "\n".join(paragraphs),
+            }
+        )
+    return pd.DataFrame(rows, columns=["id", "title", "content"])
+
+
+def percentile(values, q):
+    # Nearest-rank percentile, None for an empty list
+    if not values:
+        return None
+    values = sorted(values)
+    rank = max(1, min(len(values), round(q / 100 * len(values) + 0.5)))
+    return values[rank - 1]
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class FakeService:
+    """
+    Latency, rate limit and error injection shared by the fakes.
+
+    :param latency: Mean latency of a call, in seconds.
+    :param jitter: Relative spread of the latency (0.5 -> +/- 50%).
+    :param rate_limit: Max number of calls per minute, None for no limit.
+    :param error_rate: Share of the calls that fail with a server error.
+    :param seed: Seed of the random generator (latencies and errors).
+    """
+
+    def __init__(
+        self, latency=0.0, jitter=0.5, rate_limit=None, error_rate=0.0, seed=0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = deque()  # time of the calls of the last minute
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.latencies = []
+
+    def reset_stats(self):
+        with self._lock:
+            self.calls = self.errors = self.rate_limited = 0
+            self.latencies = []
+
+    def _remaining(self, now) -> int:
+        while self._window and now - self._window[0] >= 60:
+            self._window.popleft()
+        return self.rate_limit - len(self._window)
+
+    def _call(self):
+        """
+        Simulate one round trip. Returns the number of calls left in the
+        current minute (None without rate limit), raises RateLimited or
+        RuntimeError for the injected failures.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            remaining = None
+            if self.rate_limit is not None:
+                remaining = self._remaining(now)
+                if remaining <= 0:
+                    self.rate_limited += 1
+                    raise RateLimited(60 - (now - self._window[0]))
+                self._window.append(now)
+                remaining -= 1
+            latency = self.latency * (1 + self.jitter * (2 * self._random.random() - 1))
+            failed = self._random.random() < self.error_rate
+        time.sleep(max(0.0, latency))
+        with self._lock:
+            self.latencies.append(time.perf_counter() - start)
+            if failed:
+                self.errors += 1
+        if failed:
+            raise RuntimeError("injected server error")
+        return remaining
+
+
+class FakeAPIError(Exception):
+    """Error of FakeOpenAI, with the status_code and response headers of openai.APIStatusError."""
+
+    def __init__(self, status_code, message, headers=None):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class _FakeRawResponse:
+    def __init__(self, response, headers, retries=0):
+        self._response = response
+        self.headers = headers
+        self.http_request = SimpleNamespace(
+            headers={"x-stainless-retry-count": str(retries)}
+        )
+
+    def parse(self):
+        return self._response
+
+
+class _FakeCompletions:
+    def __init__(self, fake):
+        self._fake = fake
+        self.with_raw_response = SimpleNamespace(create=self._create_raw)
+
+    def _create_raw(self, **kwargs):
+        return self._fake._complete(**kwargs)
+
+    def create(self, **kwargs):
+        return self._fake._complete(**kwargs).parse()
+
+
+class FakeOpenAI(FakeService):
+    """
+    Chat completions client answering "[<model>] <text>" for the text to
+    translate, with a usage of one token per 4 characters. Rate limited and
+    failed calls raise FakeAPIError 429 / 500, with the x-ratelimit-* headers
+    of the real API.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+    def _headers(self, remaining, reset=0.0):
+        if self.rate_limit is None:
+            return {}
+        return {
+            "x-ratelimit-limit-requests": str(self.rate_limit),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+
+    def _complete(self, model, messages, **kwargs):
+        try:
+            remaining = self._call()
+        except RateLimited as e:
+            headers = {
+                **self._headers(0, e.retry_after),
+                "retry-after": f"{e.retry_after:.3f}",
+            }
+            raise FakeAPIError(429, str(e), headers) from None
+        except RuntimeError as e:
+            raise FakeAPIError(500, str(e)) from None
+
+        prompt = "\n".join(message["content"] for message in messages)
+        if kwargs.get("response_format") is not None:
+            # Packed request: answer every key of the JSON object
+            texts = json.loads(
+                messages[-1]["content"].split("Original texts:\n", 1)[-1]
+            )
+            content = json.dumps(
+                {key: f"[{model}] {text}" for key, text in texts.items()}
+            )
+        else:
+            text = messages[-1]["content"].split("Original article:\n", 1)[-1].strip()
+            content = f"[{model}] {text}"
+        usage = SimpleNamespace(
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(content) // 4,
+            total_tokens=(len(prompt) + len(content)) // 4,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+        )
+        if kwargs.get("stream"):
+            response = self._stream(content, usage, kwargs.get("stream_options"))
+        else:
+            response = SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                usage=usage,
+            )
+        return _FakeRawResponse(response, self._headers(remaining))
+
+    def _stream(self, content, usage, stream_options):
+        # One event per word, then the usage if asked for, as with stream=True
+        for piece in STREAM_PIECE.findall(content):
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))],
+                usage=None,
+            )
+        if stream_options and stream_options.get("include_usage"):
+            yield SimpleNamespace(choices=[], usage=usage)
+
+
+def _http_error(status, message):
+    return HttpError(
+        httplib2.Response({"status": status}),
+        json.dumps({"error": {"code": status, "message": message}}).encode(),
+    )
+
+
+class _FakeRequest:
+    def __init__(self, drive, fn, round_trip=True):
+        self._drive = drive
+        self._fn = fn
+        self._round_trip = round_trip
+
+    def execute(self):
+        if self._round_trip:
+            self._drive._round_trip()
+        with self._drive._files_lock:
+            return self._fn()
+
+
+class _FakeBatch:
+    def __init__(self, drive, callback):
+        self._drive = drive
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id=None, callback=None):
+        request_id = request_id or str(len(self._requests) + 1)
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self):
+        # One round trip for the whole batch, then one answer per request
+        self._drive._round_trip()
+        for request_id, request, callback in self._requests:
+            request._round_trip = False
+            try:
+                if self._drive._random.random() < self._drive.error_rate:
+                    raise _http_error(500, "injected server error")
+                response, exception = request.execute(), None
+            except Exception as e:
+                response, exception = None, e
+            callback(request_id, response, exception)
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def list(self, q=None, pageToken=None, pageSize=100, **kwargs):
+        drive = self._drive
+        # Only "'<folder>' in parents and ..." queries are supported
+        folder_id = q.split("'")[1]
+
+        def run():
+            files = [
+                {"id": file_id, "name": file["name"]}
+                for file_id, file in drive.files_.items()
+                if folder_id in file["parents"] and not file["trashed"]
+            ]
+            start = int(pageToken or 0)
+            result = {"files": files[start : start + pageSize]}
+            if start + pageSize < len(files):
+                result["nextPageToken"] = str(start + pageSize)
+            return result
+
+        return _FakeRequest(drive, run)
+
+    def create(self, body, media_body=None, fields=None, **kwargs):
+        drive = self._drive
+
+        def run():
+            file_id = f"file{next(drive._ids)}"
+            drive.files_[file_id] = {
+                "name": body["name"],
+                "mimeType": body.get("mimeType", GOOGLE_DOC_MIMETYPE),
+                "parents": list(body.get("parents", [])),
+                "size": media_body.size() if media_body is not None else 0,
+                "trashed": False,
+            }
+            drive.changes_.append(file_id)
+            return {"id": file_id}
+
+        return _FakeRequest(drive, run)
+
+    def get(self, fileId, fields=None, **kwargs):
+        drive = self._drive
+        return _FakeRequest(
+            drive, lambda: {"id": fileId, "parents": drive.files_[fileId]["parents"]}
+        )
+
+    def update(
+        self, fileId, addParents=None, removeParents=None, fields=None, **kwargs
+    ):
+        drive = self._drive
+
+        def run():
+            file = drive.files_.get(fileId)
+            if file is None:
+                raise _http_error(404, f"File not found: {fileId}")
+            parents = [
+                parent
+                for parent in file["parents"]
+                if parent not in (removeParents or "").split(",")
+            ]
+            if addParents:
+                parents.append(addParents)
+            file["parents"] = parents
+            drive.changes_.append(fileId)
+            return {"id": fileId, "parents": parents}
+
+        return _FakeRequest(drive, run)
+
+
+class _FakeChanges:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        drive = self._drive
+        return _FakeRequest(drive, lambda: {"startPageToken": str(len(drive.changes_))})
+
+    def list(self, pageToken, pageSize=1000, **kwargs):
+        drive = self._drive
+
+        def run():
+            start = int(pageToken)
+            changes = []
+            for file_id in drive.changes_[start : start + pageSize]:
+                file = drive.files_[file_id]
+                changes.append(
+                    {
+                        "fileId": file_id,
+                        "removed": False,
+                        "file": {
+                            "name": file["name"],
+                            "mimeType": file["mimeType"],
+                            "parents": file["parents"],
+                            "trashed": file["trashed"],
+                        },
+                    }
+                )
+            result = {"changes": changes}
+            if start + pageSize < len(drive.changes_):
+                result["nextPageToken"] = str(start + pageSize)
+            else:
+                result["newStartPageToken"] = str(len(drive.changes_))
+            return result
+
+        return _FakeRequest(drive, run)
+
+
+class FakeDrive(FakeService):
+    """
+    In-memory Drive v3 service: files.list/create/get/update, changes and
+    batch requests. Rate limited and failed calls raise HttpError 429 / 500.
+    One instance can be shared by every thread: pass `drive.credentials` as
+    `creds` to the Drive functions once install_fake_drive() has been called.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Services are cached per thread and per credentials: one set per fake
+        self.credentials = SimpleNamespace(
+            valid=True, token="fake", expiry=None, drive=self
+        )
+        self._files_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.files_ = {}  # id -> {"name", "mimeType", "parents", "size", "trashed"}
+        self.changes_ = []  # ids of the changed files, the page token is the position
+
+    def _round_trip(self):
+        try:
+            self._call()
+        except RateLimited as e:
+            raise _http_error(429, str(e)) from None
+        except RuntimeError as e:
+            raise _http_error(500, str(e)) from None
+
+    def files(self):
+        return _FakeFiles(self)
+
+    def changes(self):
+        return _FakeChanges(self)
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatch(self, callback)
+
+    def add_files(self, folder_id, names):
+        # Pre-fill a folder, without latency
+        with self._files_lock:
+            for name in names:
+                file_id = f"file{next(self._ids)}"
+                self.files_[file_id] = {
+                    "name": name,
+                    "mimeType": GOOGLE_DOC_MIMETYPE,
+                    "parents": [folder_id],
+                    "size": 0,
+                    "trashed": False,
+                }
+                self.changes_.append(file_id)
+
+
+def install_fake_drive(drive):
+    """
+    Make get_drive_service(drive.credentials) return `drive`, in every
+    thread, and forget the folder indexes built against another service.
+    Returns a function that restores the real services.
+    """
+    from translation import drive_index, google_clients
+
+    real_build = google_clients.build
+
+    def fake_build(name, version, credentials=None, cache_discovery=False):
+        fake = getattr(credentials, "drive", None)
+        if name != "drive" or fake is None:
+            return real_build(
+                name, version, credentials=credentials, cache_discovery=cache_discovery
+            )
+        return fake
+
+    google_clients.build = fake_build
+    drive_index._indexes.clear()
+
+    def restore():
+        google_clients.build = real_build
+        drive_index._indexes.clear()
+
+    return restore
+
+
+class FakeCMS(FakeService):
+    """
+    SQLite copy of the CMS "posts" table, with `latency` added to every
+    query. install() points get_posts_from_titles at it.
+    """
+
+    def __init__(self, path, corpus, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.url = f"sqlite:///{path}"
+        now = pd.Timestamp.now(tz="UTC").isoformat()
+        posts = corpus.assign(created_at=now, updated_at=now)
+        with sqlite3.connect(path) as conn:
+            posts.to_sql("posts", conn, if_exists="replace", index=False)
+            conn.execute("CREATE INDEX IF NOT EXISTS posts_title ON posts (title)")
+
+    def install(self):
+        """Returns a function that restores the real CMS URL."""
+        from sqlalchemy import event
+
+        from translation import database
+
+        engine, _ = database.connect_to_db(self.url)
+        if not event.contains(engine, "before_cursor_execute", self._before_query):
+            event.listen(engine, "before_cursor_execute", self._before_query)
+        real_url = database.get_cms_db_url
+        database.get_cms_db_url = lambda: self.url
+
+        def restore():
+            database.get_cms_db_url = real_url
+
+        return restore
+
+    def _before_query(self, *args):
+        try:
+            self._call()
+        except RateLimited as e:
+            raise RuntimeError(f"CMS {e}") from None
@@ -0,0 +1,40 @@
+import argparse
+import glob
+import os
+
+from translation.storage import convert_csv_to_parquet
+
+# Fichiers convertis par défaut : articles du CMS et traductions (le suivi est
+# importé dans translation_followup.sqlite)
+DEFAULT_PATTERNS = [
+    "./data/posts.csv",
+    "./data/posts_translated_*.csv",
+    "./data/articles_traduction_*.csv",
+]
+
+
+def main(patterns, remove_csv=False):
+    csv_files = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    for csv_file in csv_files:
+        parquet_file = convert_csv_to_parquet(csv_file, remove_csv=remove_csv)
+        print(
+            f"{csv_file} -> {parquet_file} "
+            f"({os.path.getsize(parquet_file) / 1024:.0f} Ko)"
+        )
+    if not csv_files:
+        print("Aucun fichier CSV à convertir.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convertit les CSV de ./data en Parquet (lecture par colonnes et par id)."
+    )
+    parser.add_argument("patterns", nargs="*", default=DEFAULT_PATTERNS)
+    parser.add_argument(
+        "--remove-csv",
+        action="store_true",
+        help="Supprimer les CSV une fois convertis",
+    )
+    args = parser.parse_args()
+
+    main(args.patterns, args.remove_csv)
@@ -3,8 +3,14 @@ import os
 import pandas as pd
 from openai import OpenAI
 
+from translation.cache import TranslationCache
+from translation.checkpoint import RunCheckpoint
 from translation.database import get_posts_from_titles
-from translation.translation import translate_csv_column
+from translation.memory import TranslationMemory, format_reuse
+from translation.rate_limit import get_governor
+from translation.storage import write_table
+from translation.telemetry import TelemetryStore, format_summary, telemetry_run
+from translation.translation import translate_csv_column_multi
 
 # Load the data
 data = pd.read_csv("./data/articles_traduction_espagnol_241016.csv")
@@ -21,22 +27,57 @@ posts_df = get_posts_from_titles(data)
 
 # Initialize the OpenAI API
 api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Retries go through the rate governor shared with the dashboard (if enabled)
+client = OpenAI(api_key=api_key, max_retries=0 if get_governor() else 2)
 
 # Translate the content of the posts
 source_language_code = "fr"
-target_language_code = "es"
+# Several target languages are translated in the same pass, e.g. "en,es"
+target_language_codes = os.getenv("TRANSLATION_TARGET_LANGUAGES", "es").split(",")
 model_name = "gpt-4o"
+# Number of articles translated at the same time (bounded by the OpenAI rate limit)
+max_workers = int(os.getenv("TRANSLATION_MAX_WORKERS", "8"))
+# Bulk mode goes through the OpenAI Batch API: half price, results within 24h
+bulk = os.getenv("TRANSLATION_BULK") == "1"
+# Pack mode translates several titles / short texts per request (JSON output)
+pack = os.getenv("TRANSLATION_PACK") == "1"
+# Translations already paid for are reused when the script is re-run
+cache = TranslationCache()
+# With TRANSLATION_MEMORY=1, paragraphs already translated and reviewed in other
+# articles are not sent again
+memory = TranslationMemory() if os.getenv("TRANSLATION_MEMORY") == "1" else None
+# Tokens, latency and cost of every OpenAI call of the run
+telemetry_store = TelemetryStore()
+# Each translated row is saved in ./data/runs/<run>/ as it completes: running the
+# script again resumes the run where it stopped (see manifest.json for progress)
+output_name = f"posts_translated_{'_'.join(target_language_codes)}_Cintia_241016"
+checkpoint = RunCheckpoint(os.getenv("TRANSLATION_RUN", output_name))
 
-df_translated = translate_csv_column(
-    posts_df,
-    ["title", "content"],
-    client,
-    source_language_code,
-    target_language_code,
-    model_name,
-    temperature=0,
+with telemetry_run(telemetry_store, os.getenv("USER"), "main") as run_id:
+    df_translated = translate_csv_column_multi(
+        posts_df,
+        ["title", "content"],
+        client,
+        source_language_code,
+        target_language_codes,
+        model_name,
+        temperature=0,
+        max_workers=max_workers,
+        cache=cache,
+        bulk=bulk,
+        pack=pack,
+        memory=memory,
+        checkpoint=checkpoint,
+    )
+manifest = checkpoint.manifest
+print(
+    f"Run {checkpoint.name}: {manifest['done']}/{manifest['total']} rows done "
+    f"({manifest['resumed']} from a previous attempt, {manifest['failed']} failed)"
 )
+print(f"Translation cache: {cache.stats()}")
+if memory is not None:
+    print(format_reuse(memory.reuse_report(posts_df["id"])))
+print(format_summary(telemetry_store.run_summary(run_id)))
 
 # Save the translated posts
-df_translated.to_csv("./data/posts_translated_es_Cintia_241016.csv", index=False)
+write_table(df_translated, f"./data/{output_name}.csv")
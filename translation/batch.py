@@ -0,0 +1,430 @@
+import hashlib
+import io
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from translation.cache import make_cache_key
+from translation.chunking import DEFAULT_CHUNK_TOKENS, split_into_chunks
+from translation.telemetry import count_words, record_call
+from translation.translation import (
+    MAX_COMPLETION_TOKENS,
+    PROMPT_VERSION,
+    build_messages,
+    merge_chunk_results,
+)
+
+# Limits of the OpenAI Batch API
+BATCH_MAX_REQUESTS = 50_000
+BATCH_MAX_BYTES = 200_000_000
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+# Rounds of batches: the requests left without answer (expired batch) or
+# failed are submitted again in the next round
+BATCH_ROUNDS = 3
+
+
+def split_batches(batch_requests) -> list:
+    """
+    JSONL lines of the requests (one JSON request per line, as expected by
+    the Batch API), grouped in batches within the request count and the
+    input file size limits.
+    """
+    batches = []
+    size = 0
+    for batch_request in batch_requests:
+        line = json.dumps(batch_request, ensure_ascii=False) + "\n"
+        line_size = len(line.encode("utf-8"))
+        if (
+            not batches
+            or len(batches[-1]) >= BATCH_MAX_REQUESTS
+            or size + line_size > BATCH_MAX_BYTES
+        ):
+            batches.append([])
+            size = 0
+        batches[-1].append(line)
+        size += line_size
+    return batches
+
+
+def write_batch_file(lines, path) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(lines)
+    return path
+
+
+def submit_batch(client, path) -> str:
+    with open(path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+    )
+    print(f"Batch {batch.id} soumis ({path}).")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id, poll_interval=60):
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status in BATCH_FINAL_STATUSES:
+            return batch
+        counts = batch.request_counts
+        if counts is not None:
+            print(f"Batch {batch_id} {batch.status}: {counts.completed}/{counts.total}")
+        time.sleep(poll_interval)
+
+
+def read_batch_results(client, batch, model_name, words=None) -> dict:
+    """
+    Return {custom_id: (translation, error)} for every line of the output and
+    error files of a finished batch. The usage of each request is recorded in
+    the telemetry, under `model_name` (the responses name a dated snapshot of
+    the model) and the text id of its custom_id, with the number of source
+    words given in `words` ({custom_id: words}).
+    """
+    words = words or {}
+    results = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            body = response.get("body") or {}
+            article_id = item["custom_id"].split("|", 1)[0]
+            if item.get("error") or response.get("status_code") != 200:
+                error = item.get("error") or body.get("error")
+                results[item["custom_id"]] = (None, RuntimeError(str(error)))
+                record_call(
+                    model_name,
+                    article_id,
+                    words=words.get(item["custom_id"], 0),
+                    batch=True,
+                    error=error,
+                )
+                continue
+            content = body["choices"][0]["message"]["content"]
+            results[item["custom_id"]] = (content.strip(), None)
+            record_call(
+                model_name,
+                article_id,
+                usage=body.get("usage"),
+                words=words.get(item["custom_id"], 0),
+                batch=True,
+            )
+    return results
+
+
+def translate_texts_batch(
+    texts,
+    client,
+    source_language_code,
+    target_language_code,
+    model_name,
+    temperature,
+    ids=None,
+    cache=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    batch_dir="./data",
+    poll_interval=60,
+) -> list:
+    """
+    Same contract as translate_texts, through the OpenAI Batch API: half the
+    price and no per-minute rate limit, but results can take up to 24h.
+
+    `ids` are used as custom_id prefixes (one per text) to merge the results
+    back; they default to the position of each text.
+    """
+    return translate_texts_batch_multi(
+        texts,
+        client,
+        source_language_code,
+        [target_language_code],
+        model_name,
+        temperature,
+        ids=ids,
+        cache=cache,
+        chunk_tokens=chunk_tokens,
+        batch_dir=batch_dir,
+        poll_interval=poll_interval,
+    )[target_language_code]
+
+
+def translate_texts_batch_multi(
+    texts,
+    client,
+    source_language_code,
+    target_language_codes,
+    model_name,
+    temperature,
+    ids=None,
+    cache=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    batch_dir="./data",
+    poll_interval=60,
+    text_languages=None,
+    checkpoint=None,
+) -> dict:
+    """
+    Same contract as translate_texts_multi, through the OpenAI Batch API: the
+    requests of every language go in the same batches.
+
+    With a started RunCheckpoint, the id of every batch submitted is saved in
+    it, and a batch with the same requests submitted by a previous attempt of
+    the run is waited for instead of being submitted (and paid) again.
+
+    The requests left without answer by an expired batch, or failed, are
+    submitted again, up to BATCH_ROUNDS rounds in all.
+    """
+    texts = list(texts)
+    ids = [str(i) for i in (ids if ids is not None else range(len(texts)))]
+    texts_chunks = [
+        split_into_chunks(text, chunk_tokens) if isinstance(text, str) else [text]
+        for text in texts
+    ]
+
+    # Only send what is not cached yet, custom_id: "<text id>|<lang>|<chunk>"
+    chunk_results = {}
+    batch_requests = []
+    cache_keys = {}
+    chunk_words = {}
+    for target_language_code in target_language_codes:
+        for position, (text_id, text_chunks) in enumerate(zip(ids, texts_chunks)):
+            if (
+                text_languages is not None
+                and target_language_code not in text_languages[position]
+            ):
+                continue
+            for chunk_index, chunk in enumerate(text_chunks):
+                custom_id = f"{text_id}|{target_language_code}|{chunk_index}"
+                if isinstance(chunk, str) and not chunk.strip():
+                    chunk_results[custom_id] = (chunk, None)
+                    continue
+                if cache is not None:
+                    cache_keys[custom_id] = make_cache_key(
+                        chunk,
+                        source_language_code,
+                        target_language_code,
+                        model_name,
+                        temperature,
+                        PROMPT_VERSION,
+                    )
+                    cached = cache.get(cache_keys[custom_id])
+                    if cached is not None:
+                        chunk_results[custom_id] = (cached, None)
+                        record_call(
+                            model_name,
+                            custom_id.split("|", 1)[0],
+                            words=count_words(chunk),
+                            cache_hit=True,
+                        )
+                        continue
+                chunk_words[custom_id] = count_words(chunk)
+                batch_requests.append(
+                    {
+                        "custom_id": custom_id,
+                        "method": "POST",
+                        "url": BATCH_ENDPOINT,
+                        "body": {
+                            "model": model_name,
+                            "messages": build_messages(
+                                chunk, source_language_code, target_language_code
+                            ),
+                            "max_tokens": MAX_COMPLETION_TOKENS,
+                            "temperature": temperature,
+                        },
+                    }
+                )
+
+    submitted = checkpoint.batches() if checkpoint is not None else {}
+    os.makedirs(batch_dir, exist_ok=True)
+    run_name = time.strftime("%d%m%y_%H%M%S")
+    languages = "_".join(target_language_codes)
+    for batch_round in range(BATCH_ROUNDS):
+        if batch_round and batch_requests:
+            print(f"{len(batch_requests)} requêtes sans réponse soumises à nouveau.")
+        # Submit every batch first, then wait for all of them
+        batch_ids = []
+        for number, lines in enumerate(split_batches(batch_requests)):
+            # Batches are known by their content: the requests of a resumed
+            # run (and of its later rounds) are built again in the same order
+            key = hashlib.sha256("".join(lines).encode("utf-8")).hexdigest()
+            batch_id = submitted.get(key)
+            if batch_id is not None:
+                status = client.batches.retrieve(batch_id).status
+                if status in ("failed", "cancelled"):
+                    batch_id = None
+                else:
+                    print(f"Batch {batch_id} repris ({status}).")
+            if batch_id is None:
+                path = write_batch_file(
+                    lines,
+                    f"{batch_dir}/batch_{languages}_{run_name}_{batch_round}_{number}.jsonl",
+                )
+                batch_id = submit_batch(client, path)
+                if checkpoint is not None:
+                    checkpoint.add_batch(key, batch_id)
+            batch_ids.append(batch_id)
+
+        for batch_id in batch_ids:
+            batch = wait_for_batch(client, batch_id, poll_interval)
+            if batch.status != "completed":
+                print(f"Batch {batch_id} terminé avec le statut {batch.status}.")
+            for custom_id, result in read_batch_results(
+                client, batch, model_name, chunk_words
+            ).items():
+                chunk_results[custom_id] = result
+                if cache is not None and result[1] is None:
+                    cache.set(cache_keys[custom_id], result[0])
+
+        # Requests missing from the output (expired batch) or failed
+        batch_requests = [
+            batch_request
+            for batch_request in batch_requests
+            if chunk_results.get(batch_request["custom_id"], (None, True))[1]
+            is not None
+        ]
+        if not batch_requests:
+            break
+
+    # Merge the chunks back by custom_id
+    missing = (None, RuntimeError("missing from the batch output"))
+    results = {}
+    for target_language_code in target_language_codes:
+        results[target_language_code] = []
+        for position, (text_id, text_chunks) in enumerate(zip(ids, texts_chunks)):
+            if (
+                text_languages is not None
+                and target_language_code not in text_languages[position]
+            ):
+                results[target_language_code].append((None, None))
+                continue
+            results[target_language_code].extend(
+                merge_chunk_results(
+                    [text_chunks],
+                    [
+                        chunk_results.get(
+                            f"{text_id}|{target_language_code}|{chunk_index}", missing
+                        )
+                        for chunk_index in range(len(text_chunks))
+                    ],
+                )
+            )
+    return results
+
+
+class _LocalFiles:
+    def __init__(self, store):
+        self._store = store
+
+    def create(self, file, purpose):
+        file_id = f"file-{len(self._store) + 1}"
+        self._store[file_id] = file.read().decode("utf-8")
+        return SimpleNamespace(id=file_id, purpose=purpose)
+
+    def content(self, file_id):
+        return SimpleNamespace(text=self._store[file_id])
+
+
+class _LocalBatches:
+    def __init__(self, client):
+        self._client = client
+        self._batches = {}
+
+    def create(self, input_file_id, endpoint, completion_window):
+        batch_id = f"batch-{len(self._batches) + 1}"
+        self._batches[batch_id] = {"input_file_id": input_file_id, "polls": 0}
+        return self.retrieve(batch_id)
+
+    def retrieve(self, batch_id):
+        batch = self._batches[batch_id]
+        lines = self._client._files_store[batch["input_file_id"]].splitlines()
+        counts = SimpleNamespace(total=len(lines), completed=0, failed=0)
+        if batch["polls"] < self._client.polls_before_completion:
+            batch["polls"] += 1
+            return SimpleNamespace(
+                id=batch_id,
+                status="in_progress",
+                request_counts=counts,
+                output_file_id=None,
+                error_file_id=None,
+            )
+        if "output_file_id" not in batch:
+            batch["output_file_id"] = self._client._run(lines)
+        counts.completed = counts.total
+        return SimpleNamespace(
+            id=batch_id,
+            status="completed",
+            request_counts=counts,
+            output_file_id=batch["output_file_id"],
+            error_file_id=None,
+        )
+
+
+class LocalBatchClient:
+    """
+    Offline stand-in for the files/batches endpoints of the OpenAI client.
+
+    Requests are answered by `chat_client.chat.completions.create` when a chat
+    client is given, and by echoing the prompt text otherwise. Batches stay
+    "in_progress" for `polls_before_completion` calls to retrieve().
+    """
+
+    def __init__(self, chat_client=None, polls_before_completion=1):
+        self.chat_client = chat_client
+        self.polls_before_completion = polls_before_completion
+        self._files_store = {}
+        self.files = _LocalFiles(self._files_store)
+        self.batches = _LocalBatches(self)
+
+    def _answer(self, body):
+        # (content, usage) of the request
+        if self.chat_client is None:
+            content = body["messages"][-1]["content"]
+            return content.split("Original article:\n", 1)[-1], None
+        response = self.chat_client.chat.completions.create(**body)
+        usage = getattr(response, "usage", None)
+        if usage is not None and hasattr(usage, "model_dump"):
+            usage = usage.model_dump()
+        elif usage is not None:
+            usage = {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+            }
+        return response.choices[0].message.content, usage
+
+    def _run(self, lines) -> str:
+        output = []
+        for line in lines:
+            batch_request = json.loads(line)
+            try:
+                content, usage = self._answer(batch_request["body"])
+                body = {
+                    "model": batch_request["body"]["model"],
+                    "choices": [{"message": {"content": content}}],
+                    "usage": usage,
+                }
+                response = {"status_code": 200, "body": body}
+                error = None
+            except Exception as e:
+                response = None
+                error = {"message": str(e)}
+            output.append(
+                json.dumps(
+                    {
+                        "custom_id": batch_request["custom_id"],
+                        "response": response,
+                        "error": error,
+                    },
+                    ensure_ascii=False,
+                )
+            )
+        return self.files.create(
+            io.BytesIO("\n".join(output).encode("utf-8")), "batch_output"
+        ).id
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_FILE = "./data/translation_cache.sqlite"
+
+
+def make_cache_key(
+    text,
+    source_language_code,
+    target_language_code,
+    model_name,
+    temperature,
+    prompt_version,
+) -> str:
+    # Hash of everything that changes the output of the model
+    payload = json.dumps(
+        [
+            text,
+            source_language_code,
+            target_language_code,
+            model_name,
+            float(temperature),
+            prompt_version,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Disk-backed cache of OpenAI translations, stored in SQLite.
+
+    Entries older than `max_age` seconds are ignored and purged, and the least
+    recently used entries are evicted once the cache holds more than
+    `max_entries` translations.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_FILE,
+        max_entries=100_000,
+        max_age=90 * 24 * 3600,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS translations_accessed_at ON translations (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT translation, created_at FROM translations WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or (self.max_age and now - row[1] > self.max_age):
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE translations SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, translation):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                (key, translation, now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+        # Keep the file bounded without paying an eviction on every write
+        if self._writes % 1000 == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        with self._lock:
+            deleted = 0
+            if self.max_age:
+                deleted += self._conn.execute(
+                    "DELETE FROM translations WHERE created_at < ?",
+                    (time.time() - self.max_age,),
+                ).rowcount
+            if self.max_entries:
+                deleted += self._conn.execute(
+                    """DELETE FROM translations WHERE key IN (
+                        SELECT key FROM translations ORDER BY accessed_at DESC
+                        LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,),
+                ).rowcount
+            self._conn.commit()
+            return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM translations"
+            ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,152 @@
+import json
+import os
+import time
+
+DEFAULT_RUNS_DIR = "./data/runs"
+
+# Seconds between two rewrites of the manifest while rows keep completing
+MANIFEST_INTERVAL = 1.0
+
+
+class RunCheckpoint:
+    """
+    Durable progress of a translation run, in `<runs_dir>/<name>/`:
+
+    - checkpoint.jsonl: one line per finished row, {"id": ..., "values":
+      {"<column>_<lang>": translation}}, appended and fsynced as soon as
+      the row is translated;
+    - manifest.json: settings, status (running, then completed, incomplete
+      when rows failed, interrupted or failed) and counters of the run,
+      rewritten atomically;
+    - batches.jsonl: one line per Batch API batch submitted, {"key": ...,
+      "batch_id": ...}, so that a resumed run waits for the batches already
+      paid for (see translation.batch).
+
+    Running again with the same name skips the rows already in the
+    checkpoint, so an interrupted run resumes without paying twice.
+    """
+
+    def __init__(self, name, runs_dir=DEFAULT_RUNS_DIR):
+        self.name = name
+        self.directory = os.path.join(runs_dir, name)
+        self.checkpoint_file = os.path.join(self.directory, "checkpoint.jsonl")
+        self.manifest_file = os.path.join(self.directory, "manifest.json")
+        self.batches_file = os.path.join(self.directory, "batches.jsonl")
+        self.manifest = None
+        self._file = None
+        self._manifest_written_at = 0.0
+
+    def load(self) -> dict:
+        """{row id (str): {"<column>_<lang>": translation}} of the finished rows."""
+        rows = {}
+        if not os.path.exists(self.checkpoint_file):
+            return rows
+        with open(self.checkpoint_file, "rb") as f:
+            data = f.read()
+        # A crash can leave a partial last line: drop it before appending
+        complete = data[: data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            with open(self.checkpoint_file, "r+b") as f:
+                f.truncate(len(complete))
+        for line in complete.decode("utf-8").splitlines():
+            if line.strip():
+                row = json.loads(line)
+                rows[str(row["id"])] = row["values"]
+        return rows
+
+    def batches(self) -> dict:
+        """{key: batch id} of the batches submitted by the run."""
+        batches = {}
+        if not os.path.exists(self.batches_file):
+            return batches
+        with open(self.batches_file, "rb") as f:
+            data = f.read()
+        # As in load: a partial last line is dropped (that batch is submitted again)
+        complete = data[: data.rfind(b"\n") + 1]
+        if len(complete) != len(data):
+            with open(self.batches_file, "r+b") as f:
+                f.truncate(len(complete))
+        for line in complete.decode("utf-8").splitlines():
+            if line.strip():
+                batch = json.loads(line)
+                batches[batch["key"]] = batch["batch_id"]
+        return batches
+
+    def add_batch(self, key, batch_id):
+        """Save a submitted batch, on disk before returning."""
+        with open(self.batches_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "batch_id": batch_id}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_file):
+            return None
+        with open(self.manifest_file, encoding="utf-8") as f:
+            return json.load(f)
+
+    def start(self, total, settings) -> dict:
+        """
+        Open the run for appending and return the rows already done. Raises
+        ValueError if the run was started with other settings (columns,
+        languages, model...), as its rows would not match.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self.read_manifest()
+        if previous is not None and previous["settings"] != settings:
+            raise ValueError(
+                f"Run {self.name} was started with {previous['settings']}, "
+                f"not {settings}: use another run name"
+            )
+        done = self.load()
+        now = time.time()
+        self.manifest = {
+            "name": self.name,
+            "settings": settings,
+            "status": "running",
+            "total": total,
+            "done": len(done),
+            "resumed": len(done),
+            "failed": 0,
+            "started_at": previous["started_at"] if previous else now,
+            "updated_at": now,
+            "finished_at": None,
+        }
+        self._write_manifest()
+        self._file = open(self.checkpoint_file, "a", encoding="utf-8")
+        return done
+
+    def add(self, row_id, values):
+        """Append a finished row, on disk before returning."""
+        self._file.write(
+            json.dumps({"id": row_id, "values": values}, ensure_ascii=False) + "\n"
+        )
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.manifest["done"] += 1
+        self._write_manifest(force=False)
+
+    def add_failed(self):
+        # Failed rows are not checkpointed: they are translated again on resume
+        self.manifest["failed"] += 1
+        self._write_manifest(force=False)
+
+    def finish(self, status="completed"):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.manifest["status"] = status
+        self.manifest["finished_at"] = time.time()
+        self._write_manifest()
+
+    def _write_manifest(self, force=True):
+        now = time.time()
+        if not force and now - self._manifest_written_at < MANIFEST_INTERVAL:
+            return
+        self.manifest["updated_at"] = now
+        # Write then rename, so that readers never see a half-written manifest
+        tmp_file = self.manifest_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+        self._manifest_written_at = now
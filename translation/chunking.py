@@ -0,0 +1,117 @@
+import re
+import warnings
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+    warnings.warn(
+        "tiktoken is not installed: token counts are estimated from the "
+        "number of characters, chunks may exceed their token budget"
+    )
+
+# Size of the pieces sent to the model, in prompt tokens
+DEFAULT_CHUNK_TOKENS = 1500
+
+# A block ends after a closing HTML block tag or a blank line
+BLOCK_END = re.compile(
+    r"</(?:p|h[1-6]|ul|ol|table|blockquote|div|figure|pre|section)\s*>\s*|\n\s*\n",
+    re.IGNORECASE,
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_encoding = None
+
+
+def count_tokens(text) -> int:
+    global _encoding
+    if tiktoken is None:
+        # About 4 characters per token for French and English
+        return len(text) // 4 + 1
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("o200k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _split_on(pattern, text) -> list:
+    # Split after each match, so that "".join(pieces) == text
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        if match.end() > start:
+            pieces.append(text[start : match.end()])
+            start = match.end()
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
+
+
+def _split_oversized(block, max_tokens) -> list:
+    # Paragraph too long on its own: cut between sentences, then hard cut
+    pieces = []
+    for sentence in _split_on(SENTENCE_END, block):
+        tokens = count_tokens(sentence)
+        if tokens <= max_tokens:
+            pieces.append(sentence)
+            continue
+        step = max(1, len(sentence) * max_tokens // tokens)
+        pieces.extend(sentence[i : i + step] for i in range(0, len(sentence), step))
+    return pieces
+
+
+def split_into_chunks(text, max_tokens=DEFAULT_CHUNK_TOKENS) -> list:
+    """
+    Split `text` on paragraph / HTML block boundaries into chunks of at most
+    `max_tokens` tokens. Concatenating the chunks gives back `text`.
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks = []
+    current = ""
+    current_tokens = 0
+    for block in _split_on(BLOCK_END, text):
+        block_tokens = count_tokens(block)
+        pieces = (
+            [block]
+            if block_tokens <= max_tokens
+            else _split_oversized(block, max_tokens)
+        )
+        for piece in pieces:
+            piece_tokens = block_tokens if len(pieces) == 1 else count_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append(current)
+                current, current_tokens = "", 0
+            current += piece
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def join_chunks(source_chunks, translated_chunks) -> str:
+    # The model strips surrounding whitespace, put back the one of the source
+    parts = []
+    for source, translated in zip(source_chunks, translated_chunks):
+        if not source.strip():
+            parts.append(source)
+            continue
+        start = len(source) - len(source.lstrip())
+        end = len(source.rstrip())
+        parts.append(source[:start] + translated + source[end:])
+    return "".join(parts)
+
+
+def split_into_segments(text, max_tokens=DEFAULT_CHUNK_TOKENS) -> list:
+    """
+    Split `text` into its paragraphs / HTML blocks, the unit of the
+    translation memory. Blocks above `max_tokens` are cut like chunks.
+    Concatenating the segments gives back `text`.
+    """
+    segments = []
+    for block in _split_on(BLOCK_END, text):
+        if count_tokens(block) <= max_tokens:
+            segments.append(block)
+        else:
+            segments.extend(split_into_chunks(block, max_tokens))
+    return segments
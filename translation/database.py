@@ -1,15 +1,45 @@
 import os
+import threading
 
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import column, create_engine, select, table, text
 from sqlalchemy.orm import sessionmaker
 
+from translation.posts_store import POST_COLUMNS, PostStore
+from translation.storage import write_table
+
+# Rows fetched per round trip when streaming from the CMS
+DB_CHUNK_SIZE = 500
+# Max number of titles/ids bound in one "IN (...)" clause
+DB_IN_CLAUSE_SIZE = 1000
+
+_engines = {}
+_engines_lock = threading.Lock()
+
 
 # Connexion to database
 def connect_to_db(db_url: str) -> tuple:
-    engine = create_engine(db_url)
-    session_maker = sessionmaker(bind=engine)
-    return engine, session_maker
+    # One pooled engine per URL, reused across calls
+    with _engines_lock:
+        if db_url not in _engines:
+            engine = create_engine(db_url, pool_size=5, pool_pre_ping=True)
+            _engines[db_url] = (engine, sessionmaker(bind=engine))
+        return _engines[db_url]
+
+
+def get_cms_db_url() -> str:
+    return (
+        "postgresql://"
+        + os.getenv("CMS_DB_USER")
+        + ":"
+        + os.getenv("CMS_DB_PWD")
+        + "@"
+        + os.getenv("CMS_DB_HOST")
+        + ":"
+        + os.getenv("CMS_DB_PORT")
+        + "/"
+        + os.getenv("CMS_DB_NAME")
+    )
 
 
 # Load data from CMS database
@@ -20,40 +50,113 @@ def load_data_from_db(
     interval: str = None,
 ) -> pd.DataFrame:
     session = session_maker()
+    query = select(text("*")).select_from(table(table_name))
     if interval:
-        query = f"SELECT * FROM {table_name} WHERE created_at >= NOW() - INTERVAL '{interval}'"
-    else:
-        query = f"SELECT * FROM {table_name}"
+        query = query.where(
+            text("created_at >= NOW() - CAST(:interval AS INTERVAL)").bindparams(
+                interval=interval
+            )
+        )
     df = pd.read_sql_query(query, engine)
     session.close()
     return df
 
 
-def get_posts_from_titles(df) -> pd.DataFrame:
-    # Get the posts from the db
-    CMS_DB_URL = (
-        "postgresql://"
-        + os.getenv("CMS_DB_USER")
-        + ":"
-        + os.getenv("CMS_DB_PWD")
-        + "@"
-        + os.getenv("CMS_DB_HOST")
-        + ":"
-        + os.getenv("CMS_DB_PORT")
-        + "/"
-        + os.getenv("CMS_DB_NAME")
-    )
-    cms_engine, cms_session_maker = connect_to_db(CMS_DB_URL)
+def iter_posts(
+    engine,
+    columns=POST_COLUMNS,
+    titles=None,
+    ids=None,
+    since=None,
+    watermark_column="updated_at",
+    table_name="posts",
+    chunksize=DB_CHUNK_SIZE,
+):
+    """
+    Stream the posts from the CMS as DataFrames of `chunksize` rows.
+
+    Only `columns` are selected, and the title / id / watermark filters are
+    applied in SQL with bound parameters: `since` keeps the rows whose
+    `watermark_column` is at or after it.
+    """
+    posts = table(table_name, *[column(name) for name in {*columns, watermark_column}])
+    query = select(*[posts.c[name] for name in columns])
+    if since is not None:
+        query = query.where(posts.c[watermark_column] >= since)
+
+    # Split long title / id lists so that each query stays reasonably sized
+    if titles is not None:
+        key, values = "title", list(titles)
+    elif ids is not None:
+        key, values = "id", [int(post_id) for post_id in ids]
+    else:
+        key, values = None, [None]
+    for start in range(0, len(values), DB_IN_CLAUSE_SIZE):
+        chunk_query = query
+        if key is not None:
+            chunk_query = query.where(
+                posts.c[key].in_(values[start : start + DB_IN_CLAUSE_SIZE])
+            )
+        with engine.connect() as conn:
+            # Server-side cursor: rows are not all loaded in memory at once
+            conn = conn.execution_options(stream_results=True)
+            yield from pd.read_sql_query(chunk_query, conn, chunksize=chunksize)
+
 
-    posts_df = load_data_from_db("posts", cms_engine, cms_session_maker)
+def sync_posts(engine, post_store=None, watermark_column="updated_at") -> int:
+    """
+    Copy into the local PostStore the posts created or modified since the last
+    sync (watermark on `watermark_column`). Returns the number of rows written.
+    """
+    post_store = post_store if post_store is not None else PostStore()
+    since = post_store.get_watermark(f"cms_posts_{watermark_column}")
+    watermark = None
+    written = 0
+    for chunk in iter_posts(
+        engine,
+        columns=(*POST_COLUMNS, watermark_column),
+        since=None if since is None else pd.Timestamp(since).to_pydatetime(),
+        watermark_column=watermark_column,
+    ):
+        written += post_store.sync(chunk)
+        chunk_max = chunk[watermark_column].max()
+        if pd.notna(chunk_max) and (watermark is None or chunk_max > watermark):
+            watermark = chunk_max
+    if watermark is not None:
+        post_store.set_watermark(
+            f"cms_posts_{watermark_column}", pd.Timestamp(watermark).isoformat()
+        )
+    return written
 
-    # ONly keep the posts with the title in the df
-    posts_df = posts_df[posts_df["title"].isin(df["title"].values)]
 
-    # Keep only the columns we need
-    posts_df = posts_df[["id", "title", "content"]]
+def get_posts_from_titles(df, incremental=False) -> pd.DataFrame:
+    """
+    Posts (id, title, content) whose title is in df["title"], saved to
+    ./data/posts.csv (or .parquet). With `incremental=True` only the posts changed since the
+    last sync are fetched from the CMS, and the titles are resolved locally.
+    """
+    # Get the posts from the db
+    cms_engine, cms_session_maker = connect_to_db(get_cms_db_url())
+    titles = df["title"].dropna().unique().tolist()
+    post_store = PostStore()
+
+    if incremental:
+        sync_posts(cms_engine, post_store)
+        posts_df = post_store.get_posts_by_titles(titles)
+    else:
+        # Only fetch the posts with the title in the df, and the columns we need
+        chunks = list(iter_posts(cms_engine, POST_COLUMNS, titles=titles))
+        posts_df = (
+            pd.concat(chunks, ignore_index=True)
+            if chunks
+            else pd.DataFrame(columns=list(POST_COLUMNS))
+        )
+
+    # Save the posts in a csv (or parquet, see DATA_FORMAT) file
+    posts_file = write_table(posts_df, "./data/posts.csv")
 
-    # Save the posts in a csv file
-    posts_df.to_csv("./data/posts.csv", index=False)
+    # Update the id-indexed store with the posts that changed only
+    post_store.sync(posts_df)
+    post_store.mark_synced(posts_file)
 
     return posts_df
@@ -0,0 +1,178 @@
+import threading
+import time
+
+GOOGLE_DOC_MIMETYPE = "application/vnd.google-apps.document"
+
+# Au-delà de ce délai (en secondes), l'index relit le flux de changements Drive
+MAX_STALENESS = 30
+
+
+def docid_prefix(name):
+    # "45_Titre de l'article" -> "45"
+    return name.split("_", 1)[0] if "_" in name else None
+
+
+class FolderIndex:
+    """
+    Index local des Google Docs d'un dossier Drive : nom -> IDs et
+    préfixe docid -> fichiers.
+
+    Construit à partir d'un seul listing paginé du dossier, puis tenu à jour
+    par le flux de changements Drive (`changes.list`) au lieu d'une requête
+    `files.list` par document.
+    """
+
+    def __init__(self, service_drive, folder_id, max_staleness=MAX_STALENESS):
+        self._local = threading.local()
+        self.service_drive = service_drive
+        self.folder_id = folder_id
+        self.max_staleness = max_staleness
+        self._lock = threading.RLock()
+        self._files = {}  # id -> nom
+        self._by_name = {}  # nom -> {id}
+        self._by_prefix = {}  # docid -> {id}
+        self._page_token = None
+        self._refreshed_at = 0
+        self.build()
+
+    # Le service Drive n'est pas thread-safe : chaque thread utilise le sien
+    @property
+    def service_drive(self):
+        return getattr(self._local, "service_drive", None) or self._default_service
+
+    @service_drive.setter
+    def service_drive(self, service_drive):
+        if not hasattr(self, "_default_service"):
+            self._default_service = service_drive
+        self._local.service_drive = service_drive
+
+    def _add(self, file_id, name):
+        self._remove(file_id)
+        self._files[file_id] = name
+        self._by_name.setdefault(name, set()).add(file_id)
+        prefix = docid_prefix(name)
+        if prefix is not None:
+            self._by_prefix.setdefault(prefix, set()).add(file_id)
+
+    def _remove(self, file_id):
+        name = self._files.pop(file_id, None)
+        if name is None:
+            return
+        self._by_name.get(name, set()).discard(file_id)
+        prefix = docid_prefix(name)
+        if prefix is not None:
+            self._by_prefix.get(prefix, set()).discard(file_id)
+
+    def build(self):
+        """Liste tout le dossier (paginé) et repart de zéro."""
+        with self._lock:
+            # Le jeton est pris avant le listing pour ne rater aucun changement
+            self._page_token = (
+                self.service_drive.changes()
+                .getStartPageToken(supportsAllDrives=True)
+                .execute()["startPageToken"]
+            )
+            self._files, self._by_name, self._by_prefix = {}, {}, {}
+            query = f"'{self.folder_id}' in parents and mimeType = '{GOOGLE_DOC_MIMETYPE}' and trashed = false"
+            page_token = None
+            while True:
+                results = (
+                    self.service_drive.files()
+                    .list(
+                        q=query,
+                        fields="nextPageToken, files(id, name)",
+                        pageSize=1000,
+                        pageToken=page_token,
+                        supportsAllDrives=True,
+                        includeItemsFromAllDrives=True,
+                    )
+                    .execute()
+                )
+                for file in results.get("files", []):
+                    self._add(file["id"], file["name"])
+                page_token = results.get("nextPageToken")
+                if not page_token:
+                    break
+            self._refreshed_at = time.monotonic()
+
+    def refresh(self, force=False):
+        """Applique les changements Drive survenus depuis la dernière lecture."""
+        with self._lock:
+            if not force and time.monotonic() - self._refreshed_at < self.max_staleness:
+                return
+            page_token = self._page_token
+            while page_token:
+                results = (
+                    self.service_drive.changes()
+                    .list(
+                        pageToken=page_token,
+                        fields="nextPageToken, newStartPageToken, changes(fileId, removed, file(name, mimeType, parents, trashed))",
+                        pageSize=1000,
+                        supportsAllDrives=True,
+                        includeItemsFromAllDrives=True,
+                    )
+                    .execute()
+                )
+                for change in results.get("changes", []):
+                    file = change.get("file") or {}
+                    if (
+                        change.get("removed")
+                        or file.get("trashed")
+                        or file.get("mimeType") != GOOGLE_DOC_MIMETYPE
+                        or self.folder_id not in file.get("parents", [])
+                    ):
+                        self._remove(change["fileId"])
+                    else:
+                        self._add(change["fileId"], file["name"])
+                if "newStartPageToken" in results:
+                    self._page_token = results["newStartPageToken"]
+                page_token = results.get("nextPageToken")
+            self._refreshed_at = time.monotonic()
+
+    def exists(self, name) -> bool:
+        self.refresh()
+        with self._lock:
+            return bool(self._by_name.get(name))
+
+    def files_with_prefix(self, docid) -> list:
+        """Fichiers dont le nom commence par 'docid_' ({"id", "name"})."""
+        self.refresh()
+        with self._lock:
+            return [
+                {"id": file_id, "name": self._files[file_id]}
+                for file_id in sorted(self._by_prefix.get(str(docid), ()))
+            ]
+
+    def name(self, file_id):
+        with self._lock:
+            return self._files.get(file_id)
+
+    def add(self, file_id, name):
+        # Enregistrer un fichier qu'on vient de créer ou de déplacer ici
+        with self._lock:
+            self._add(file_id, name)
+
+    def remove(self, file_id):
+        with self._lock:
+            self._remove(file_id)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_folder_index(service_drive, folder_id) -> FolderIndex:
+    """Index partagé du dossier `folder_id`, construit au premier appel."""
+    with _indexes_lock:
+        index = _indexes.get(folder_id)
+        if index is None:
+            index = _indexes[folder_id] = FolderIndex(service_drive, folder_id)
+        else:
+            index.service_drive = service_drive
+        return index
+
+
+def get_known_folder_index(folder_id):
+    # Index du dossier s'il a déjà été construit, sans appel Drive
+    with _indexes_lock:
+        return _indexes.get(folder_id)
@@ -0,0 +1,676 @@
+import os
+import time
+
+import pandas as pd
+
+from translation.languages import check_language
+from translation.sqlite_store import SQLiteStore
+from translation.storage import read_table, resolve_path, write_table
+
+DEFAULT_FOLLOWUP_DB = "./data/translation_followup.sqlite"
+
+# Statuses of an article in a language, in workflow order. In the legacy
+# (wide) view they are columns suffixed with "_<lang>"
+STATUS_COLUMNS = (
+    "to_be_translated",
+    "ai_translated",
+    "translation_reviewed",
+    "approved",
+)
+ACTOR_COLUMNS = ("translation_reviewed_by", "approved_by")
+
+# Status column and actor column set by each role
+ROLE_STAGES = {
+    "translator": ("ai_translated", None),
+    "reviewer": ("translation_reviewed", "translation_reviewed_by"),
+    "approver": ("approved", "approved_by"),
+}
+
+# Stage of an article in a language, from its latest status (see
+# _stage_sql): the work it waits for, or "approved" once done
+STAGES = ("to_translate", "to_review", "to_approve", "approved")
+
+# Stage of the articles listed on the dashboard of each role
+ROLE_QUEUES = {
+    "translator": "to_translate",
+    "reviewer": "to_review",
+    "approver": "to_approve",
+}
+
+# Workflow transitions and the role allowed to apply each of them (see
+# apply_transition): the status set, the actor and the stage required come
+# from ROLE_STAGES and ROLE_QUEUES
+TRANSITIONS = {
+    "translated": "translator",
+    "reviewed": "reviewer",
+    "approved": "approver",
+}
+
+# Articles per dashboard page
+PAGE_SIZE = 50
+
+# Max number of bound parameters per "IN (...)" clause
+SQL_CHUNK_SIZE = 500
+
+
+class FollowupStore(SQLiteStore):
+    """
+    Translation follow-up table stored in SQLite (WAL mode).
+
+    Replaces the whole-file CSV: every write is a single transaction, so
+    concurrent Flask workers no longer overwrite each other.
+
+    Statuses are stored in long format, one row per (article id, language,
+    status) that is set, with its actor (table statuses): a language is one
+    row of the languages table (see translation.languages), not six columns,
+    and the cost of a read grows with the statuses that exist. The methods
+    still accept and return the legacy wide columns ("ai_translated_es",
+    "approved_by_en"...) for the languages asked for.
+
+    The stage of every article in every language is kept in a status index
+    (table status_index, maintained by triggers on the statuses), from which
+    the dashboards read one page at a time.
+
+    Every status change is also recorded in the events table, with its actor
+    and time, in the transaction of the change (see `history`).
+    """
+
+    def __init__(self, path=DEFAULT_FOLLOWUP_DB, languages=("en", "es")):
+        super().__init__(path)
+        self._languages = None
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER,
+                    title TEXT
+                )"""
+            )
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS articles_id ON articles (id)"
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS languages (
+                    code TEXT PRIMARY KEY,
+                    added_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS statuses (
+                    id INTEGER NOT NULL,
+                    lang TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    actor TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (id, lang, stage)
+                ) WITHOUT ROWID"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS status_index (
+                    lang TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    id INTEGER NOT NULL,
+                    PRIMARY KEY (lang, id)
+                ) WITHOUT ROWID"""
+            )
+            # Pages of a stage in one language, or over several, in id order
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS status_index_lang_stage ON status_index (lang, stage, id)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS status_index_stage ON status_index (stage, id, lang)"
+            )
+            # History of the status changes, never rewritten
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS events (
+                    seq INTEGER PRIMARY KEY,
+                    id INTEGER NOT NULL,
+                    lang TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    value INTEGER NOT NULL,
+                    actor TEXT,
+                    at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS events_id ON events (id, seq)")
+            self._create_status_triggers(conn)
+        for lang in languages:
+            self.add_language(lang)
+
+    def _create_status_triggers(self, conn):
+        """Keep the status index in sync with the statuses and the articles."""
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            conn.execute(
+                f"""CREATE TRIGGER IF NOT EXISTS statuses_{event.lower()}
+                AFTER {event} ON statuses
+                BEGIN
+                    DELETE FROM status_index WHERE lang = {row}.lang AND id = {row}.id;
+                    INSERT INTO status_index (lang, stage, id)
+                    SELECT {row}.lang, stage, {row}.id
+                    FROM (SELECT {_stage_sql(f"{row}.id", f"{row}.lang")} AS stage)
+                    WHERE stage IS NOT NULL;
+                END"""
+            )
+        conn.execute(
+            """CREATE TRIGGER IF NOT EXISTS articles_delete AFTER DELETE ON articles
+            BEGIN DELETE FROM statuses WHERE id = OLD.id; END"""
+        )
+
+    def columns(self, refresh=False) -> list:
+        """Columns of the legacy wide view: id, title and six per language."""
+        return [
+            "id",
+            "title",
+            *_language_columns(self.languages(refresh)),
+        ]
+
+    def languages(self, refresh=False) -> list:
+        if refresh or self._languages is None:
+            rows = self._connection().execute(
+                "SELECT code FROM languages ORDER BY added_at, code"
+            )
+            self._languages = [code for (code,) in rows]
+        return self._languages
+
+    def add_language(self, lang):
+        """Track `lang`, which must be in translation.languages.LANGUAGES."""
+        check_language(lang)
+        if lang in self.languages(refresh=True):
+            return
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO languages (code, added_at) VALUES (?, ?)",
+                (lang, time.time()),
+            )
+        self.languages(refresh=True)
+
+    def _check_columns(self, names):
+        # Column names end up in the SQL, only accept the ones of the table
+        unknown = set(names) - set(self.columns())
+        if unknown:
+            # Another process may have added a language since
+            unknown = set(names) - set(self.columns(refresh=True))
+        if unknown:
+            raise KeyError(f"Unknown follow-up columns: {sorted(unknown)}")
+
+    def is_empty(self) -> bool:
+        conn = self._connection()
+        return conn.execute("SELECT 1 FROM articles LIMIT 1").fetchone() is None
+
+    def import_csv(self, csv_file) -> int:
+        """One-time import of the legacy follow-up CSV (or Parquet). Returns the number of rows."""
+        df = read_table(csv_file)
+        for column in df.columns:
+            if column.startswith("to_be_translated_"):
+                self.add_language(column.removeprefix("to_be_translated_"))
+
+        # Rows without id (titles not found in the CMS) are kept, with a NULL id
+        # (their statuses cannot be tracked without one)
+        df["id"] = df["id"].astype("Int64")
+        articles = [
+            (
+                None if pd.isna(article_id) else int(article_id),
+                None if pd.isna(title) else title,
+            )
+            for article_id, title in zip(df["id"], df["title"])
+        ]
+        now = time.time()
+        statuses = []
+        for lang in self.languages():
+            for stage in STATUS_COLUMNS:
+                column = f"{stage}_{lang}"
+                if column not in df.columns:
+                    continue
+                rows = df[df[column].fillna(False).astype(bool) & df["id"].notna()]
+                actors = rows.get(f"{stage}_by_{lang}", pd.Series(None, rows.index))
+                statuses += [
+                    (
+                        int(article_id),
+                        lang,
+                        stage,
+                        None if pd.isna(actor) else actor,
+                        now,
+                    )
+                    for article_id, actor in zip(rows["id"], actors)
+                ]
+
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO articles (id, title) VALUES (?, ?)", articles
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO statuses (id, lang, stage, actor, updated_at) VALUES (?, ?, ?, ?, ?)",
+                statuses,
+            )
+        return len(articles)
+
+    def export_csv(self, csv_file, data_format=None) -> str:
+        return write_table(self.load(), csv_file, data_format)
+
+    def _statuses(self, article_ids=None, languages=None) -> pd.DataFrame:
+        """
+        Long format of the statuses set: one row per (id, lang, stage), with
+        the actor and time, lang and stage as categoricals.
+        """
+        conditions = []
+        params = []
+        if languages is not None:
+            languages = list(languages)
+            conditions.append(f"lang IN ({', '.join('?' * len(languages))})")
+            params += languages
+        query = "SELECT id, lang, stage, actor, updated_at FROM statuses"
+        conn = self._connection()
+        if article_ids is None:
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = conn.execute(query + where + " ORDER BY id", params).fetchall()
+        else:
+            article_ids = [int(article_id) for article_id in article_ids]
+            rows = []
+            for start in range(0, len(article_ids), SQL_CHUNK_SIZE):
+                ids = article_ids[start : start + SQL_CHUNK_SIZE]
+                chunk_conditions = [
+                    *conditions,
+                    f"id IN ({', '.join('?' * len(ids))})",
+                ]
+                rows += conn.execute(
+                    f"{query} WHERE {' AND '.join(chunk_conditions)}", [*params, *ids]
+                ).fetchall()
+        df = pd.DataFrame(rows, columns=["id", "lang", "stage", "actor", "updated_at"])
+        df["id"] = df["id"].astype("Int64")
+        languages = self.languages()
+        if not set(df["lang"]) <= set(languages):
+            # Another process may have added a language since
+            languages = self.languages(refresh=True)
+        df["lang"] = pd.Categorical(df["lang"], categories=languages)
+        df["stage"] = pd.Categorical(
+            df["stage"], categories=STATUS_COLUMNS, ordered=True
+        )
+        return df
+
+    def _to_dataframe(self, cursor, languages=None) -> pd.DataFrame:
+        """
+        Articles of `cursor` (id, title) in the legacy wide view, with the
+        status and actor columns of `languages` (all by default).
+        """
+        languages = self.languages() if languages is None else list(languages)
+        df = pd.DataFrame(cursor.fetchall(), columns=["id", "title"])
+        df["id"] = df["id"].astype("Int64")
+        if df["id"].notna().all() and len(df) > SQL_CHUNK_SIZE:
+            # Most of the table: one scan rather than chunks of ids
+            statuses = self._statuses(languages=languages)
+        else:
+            statuses = self._statuses(df["id"].dropna(), languages)
+        columns = {}
+        for lang in languages:
+            for stage in STATUS_COLUMNS:
+                columns[f"{stage}_{lang}"] = pd.Series(False, index=df.index)
+            for actor in ACTOR_COLUMNS:
+                columns[f"{actor}_{lang}"] = pd.Series(
+                    [None] * len(df), index=df.index, dtype=object
+                )
+        # Row of each id (the rows without id have no status)
+        with_id = df["id"].notna().to_numpy()
+        ids = pd.Index(df["id"][with_id].astype("int64"))
+        rows_with_id = with_id.nonzero()[0]
+        for (lang, stage), group in statuses.groupby(["lang", "stage"], observed=True):
+            found = ids.get_indexer(group["id"].astype("int64"))
+            rows = rows_with_id[found[found >= 0]]
+            columns[f"{stage}_{lang}"].iloc[rows] = True
+            if f"{stage}_by" in ACTOR_COLUMNS:
+                actors = group["actor"].to_numpy()[found >= 0]
+                columns[f"{stage}_by_{lang}"].iloc[rows] = actors
+        return pd.concat(
+            [df, pd.DataFrame(columns, index=df.index)[_language_columns(languages)]],
+            axis=1,
+        )
+
+    def load(self) -> pd.DataFrame:
+        return self._to_dataframe(
+            self._connection().execute("SELECT id, title FROM articles ORDER BY id")
+        )
+
+    def select(self, where) -> pd.DataFrame:
+        """
+        Rows whose columns equal the values of `where`, ordered by id. A list
+        of dicts selects the rows matching any of them.
+
+        e.g. select({"ai_translated_es": False, "to_be_translated_es": True})
+        """
+        conditions = where if isinstance(where, list) else [where]
+        clauses = []
+        params = []
+        for condition in conditions:
+            self._check_columns(condition)
+            terms = []
+            for column, value in condition.items():
+                if column in ("id", "title"):
+                    terms.append(f"a.{column} = ?")
+                    params.append(_to_sql(value))
+                    continue
+                stage, _, lang = column.rpartition("_")
+                exists = "SELECT 1 FROM statuses s WHERE s.id = a.id AND s.lang = ? AND s.stage = ?"
+                if stage in STATUS_COLUMNS:
+                    terms.append(f"{'' if value else 'NOT '}EXISTS ({exists})")
+                    params += [lang, stage]
+                elif value is None:
+                    terms.append(f"NOT EXISTS ({exists} AND s.actor IS NOT NULL)")
+                    params += [lang, stage.removesuffix("_by")]
+                else:
+                    terms.append(f"EXISTS ({exists} AND s.actor = ?)")
+                    params += [lang, stage.removesuffix("_by"), value]
+            clauses.append("(" + (" AND ".join(terms) or "1") + ")")
+        return self._to_dataframe(
+            self._connection().execute(
+                f"SELECT a.id, a.title FROM articles a WHERE {' OR '.join(clauses) or '0'} ORDER BY a.id",
+                params,
+            )
+        )
+
+    def page(
+        self, languages=None, stage=None, after_id=None, search=None, limit=PAGE_SIZE
+    ) -> tuple:
+        """
+        One page of articles, ordered by id, read through the status index:
+        the articles at `stage` in any of `languages` (every article without
+        `stage`), with an id above `after_id` (keyset pagination) and matching
+        `search`, an id or a part of the title. The page has the columns of
+        `languages` only.
+
+        Returns (page, after_id of the next page or None on the last page).
+        """
+        languages = list(languages or self.languages())
+        conditions = ["a.id > ?"]
+        params = [-1 if after_id is None else int(after_id)]
+        if search:
+            conditions.append("(a.id = ? OR a.title LIKE ? ESCAPE '\\')")
+            escaped = (
+                search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            params += [
+                int(search) if search.strip().isdigit() else None,
+                f"%{escaped}%",
+            ]
+        if stage is None:
+            query = f"""SELECT a.id, a.title FROM articles a WHERE {" AND ".join(conditions)}
+                ORDER BY a.id LIMIT ?"""
+        else:
+            query = f"""SELECT a.id, a.title FROM status_index s JOIN articles a ON a.id = s.id
+                WHERE s.stage = ? AND s.lang IN ({", ".join("?" * len(languages))})
+                AND s.id > ? AND {" AND ".join(conditions)}
+                GROUP BY s.id ORDER BY s.id LIMIT ?"""
+            params = [stage, *languages, params[0], *params]
+        # One more row tells whether there is a next page
+        df = self._to_dataframe(
+            self._connection().execute(query, [*params, limit + 1]), languages
+        )
+        if len(df) <= limit:
+            return df, None
+        df = df.iloc[:limit]
+        return df, int(df["id"].iloc[-1])
+
+    def counts(self, languages=None) -> dict:
+        """{lang: {stage: number of articles}} from the status index."""
+        languages = list(languages or self.languages())
+        counts = {lang: dict.fromkeys(STAGES, 0) for lang in languages}
+        rows = self._connection().execute(
+            f"""SELECT lang, stage, COUNT(*) FROM status_index
+            WHERE lang IN ({", ".join("?" * len(languages))}) GROUP BY lang, stage""",
+            languages,
+        )
+        for lang, stage, count in rows:
+            counts[lang][stage] = count
+        return counts
+
+    def get(self, article_id):
+        df = self._to_dataframe(
+            self._connection().execute(
+                "SELECT id, title FROM articles WHERE id = ?", (int(article_id),)
+            )
+        )
+        if df.empty:
+            return None
+        return df.iloc[0].to_dict()
+
+    def update(self, article_id, values, actor=None) -> int:
+        return self.bulk_update([article_id], values, actor)
+
+    def bulk_update(self, article_ids, values, actor=None) -> int:
+        """
+        Set `values` (legacy wide columns) on every article of `article_ids`
+        in one transaction. A status set to True is stored with the actor of
+        its *_by column, or `actor`; set to False, it is removed.
+        """
+        self._check_columns(values)
+        article_ids = [int(article_id) for article_id in article_ids]
+        # Statuses after the update, (lang, stage) -> actor, or False when
+        # removed; and the actors set alone, of a status already set
+        targets = {}
+        actors = {}
+        for column, value in values.items():
+            if column in ("id", "title"):
+                continue
+            stage, _, lang = column.rpartition("_")
+            if stage in STATUS_COLUMNS:
+                targets[lang, stage] = (
+                    values.get(f"{stage}_by_{lang}", actor) if value else False
+                )
+            elif f"{stage.removesuffix('_by')}_{lang}" not in values:
+                actors[lang, stage.removesuffix("_by")] = value
+        updated = []
+        with self._transaction() as conn:
+            for start in range(0, len(article_ids), SQL_CHUNK_SIZE):
+                ids = article_ids[start : start + SQL_CHUNK_SIZE]
+                updated += [
+                    article_id
+                    for (article_id,) in conn.execute(
+                        f"SELECT id FROM articles WHERE id IN ({', '.join('?' * len(ids))})",
+                        ids,
+                    )
+                ]
+            for column in ("id", "title"):
+                if column in values:
+                    conn.executemany(
+                        f"UPDATE articles SET {column} = ? WHERE id = ?",
+                        [
+                            (_to_sql(values[column]), article_id)
+                            for article_id in updated
+                        ],
+                    )
+            if targets or actors:
+                current = self._current_statuses(conn, updated)
+                # Only the statuses that change are written and recorded
+                changes = []
+                for article_id in updated:
+                    for (lang, stage), target in targets.items():
+                        key = (article_id, lang, stage)
+                        if target is False:
+                            if key in current:
+                                changes.append((*key, False, None))
+                        elif key not in current or current[key] != target:
+                            changes.append((*key, True, target))
+                    for (lang, stage), stage_actor in actors.items():
+                        key = (article_id, lang, stage)
+                        if key in current and current[key] != stage_actor:
+                            changes.append((*key, True, stage_actor))
+                _write_statuses(conn, changes, time.time())
+        return len(updated)
+
+    def _current_statuses(self, conn, article_ids) -> dict:
+        # {(id, lang, stage): actor} of the statuses set on the articles
+        current = {}
+        for start in range(0, len(article_ids), SQL_CHUNK_SIZE):
+            ids = article_ids[start : start + SQL_CHUNK_SIZE]
+            rows = conn.execute(
+                f"SELECT id, lang, stage, actor FROM statuses WHERE id IN ({', '.join('?' * len(ids))})",
+                ids,
+            )
+            current.update(
+                ((article_id, lang, stage), actor)
+                for article_id, lang, stage, actor in rows
+            )
+        return current
+
+    def history(self, article_id=None) -> list:
+        """Status changes of an article (of every article without `article_id`), oldest first."""
+        query = "SELECT id, lang, stage, value, actor, at FROM events"
+        params = ()
+        if article_id is not None:
+            query += " WHERE id = ?"
+            params = (int(article_id),)
+        rows = self._connection().execute(query + " ORDER BY seq", params)
+        return [
+            {
+                "article_id": event_id,
+                "lang": lang,
+                "stage": stage,
+                "value": bool(value),
+                "actor": actor,
+                "at": at,
+            }
+            for event_id, lang, stage, value, actor, at in rows
+        ]
+
+    def apply_transition(
+        self, article_ids, transition, lang, actor=None, role=None, languages=None
+    ) -> dict:
+        """
+        Apply `transition` ("translated", "reviewed" or "approved") in `lang`
+        to every article of `article_ids` in one transaction, and return the
+        result of each id:
+
+        - "updated": the article was at the stage the transition applies to;
+        - "not_ready": it is at an earlier stage (e.g. reviewed before translated);
+        - "already_done": it is at this stage or a later one;
+        - "not_found": no such article, or not to translate in `lang`;
+        - "invalid": not an article id.
+
+        With `role`, raises PermissionError if the role may not apply the
+        transition in `lang` (admins may apply any; the others their own, in
+        `languages`).
+        """
+        if transition not in TRANSITIONS:
+            raise ValueError(f"Unknown transition {transition!r}")
+        if lang not in self.languages(refresh=True):
+            raise ValueError(f"Unknown language {lang!r}")
+        if role is not None:
+            check_transition_permission(role, languages, transition, lang)
+        column = ROLE_STAGES[TRANSITIONS[transition]][0]
+        stage = ROLE_QUEUES[TRANSITIONS[transition]]
+
+        results = {}
+        ids = []
+        for article_id in article_ids:
+            try:
+                ids.append(int(article_id))
+            except (TypeError, ValueError):
+                results[article_id] = "invalid"
+        ids = list(dict.fromkeys(ids))
+        now = time.time()
+        with self._transaction() as conn:
+            for start in range(0, len(ids), SQL_CHUNK_SIZE):
+                chunk = ids[start : start + SQL_CHUNK_SIZE]
+                # Stage of every id from the status index, then one insert
+                stages = dict(
+                    conn.execute(
+                        f"SELECT id, stage FROM status_index WHERE lang = ? AND id IN ({', '.join('?' * len(chunk))})",
+                        (lang, *chunk),
+                    ).fetchall()
+                )
+                for article_id in chunk:
+                    current = stages.get(article_id)
+                    if current is None:
+                        results[article_id] = "not_found"
+                    elif current == stage:
+                        results[article_id] = "updated"
+                    elif STAGES.index(current) < STAGES.index(stage):
+                        results[article_id] = "not_ready"
+                    else:
+                        results[article_id] = "already_done"
+                _write_statuses(
+                    conn,
+                    [
+                        (article_id, lang, column, True, actor)
+                        for article_id in chunk
+                        if results[article_id] == "updated"
+                    ],
+                    now,
+                )
+        return results
+
+
+def check_transition_permission(role, languages, transition, lang):
+    """Raise PermissionError unless `role` may apply `transition` in `lang`."""
+    if role == "admin":
+        return
+    if TRANSITIONS.get(transition) != role:
+        raise PermissionError(f"Role {role!r} may not apply {transition!r}")
+    if lang not in (languages or ()):
+        raise PermissionError(f"Role {role!r} may not work on {lang!r} articles")
+
+
+def _language_columns(languages) -> list:
+    # Legacy wide columns of the languages: statuses, then actors
+    return [
+        f"{column}_{lang}"
+        for lang in languages
+        for column in (*STATUS_COLUMNS, *ACTOR_COLUMNS)
+    ]
+
+
+def _stage_sql(article_id, lang) -> str:
+    # SQL expression of the stage of an article in a language, from its latest
+    # status in the workflow, NULL if not to translate
+    ranks = " ".join(
+        f"WHEN '{status}' THEN {rank}" for rank, status in enumerate(STATUS_COLUMNS)
+    )
+    stages = " ".join(
+        f"WHEN {rank} THEN '{stage}'" for rank, stage in enumerate(STAGES)
+    )
+    return f"""(SELECT CASE MAX(CASE stage {ranks} END) {stages} END
+        FROM statuses WHERE id = {article_id} AND lang = {lang})"""
+
+
+def _write_statuses(conn, changes, now):
+    # Apply (id, lang, stage, value, actor) changes and record them as events
+    conn.executemany(
+        """INSERT INTO statuses (id, lang, stage, actor, updated_at)
+        VALUES (?, ?, ?, ?, ?) ON CONFLICT (id, lang, stage)
+        DO UPDATE SET actor = excluded.actor, updated_at = excluded.updated_at""",
+        [
+            (article_id, lang, stage, actor, now)
+            for article_id, lang, stage, value, actor in changes
+            if value
+        ],
+    )
+    conn.executemany(
+        "DELETE FROM statuses WHERE id = ? AND lang = ? AND stage = ?",
+        [
+            (article_id, lang, stage)
+            for article_id, lang, stage, value, _ in changes
+            if not value
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO events (id, lang, stage, value, actor, at) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (article_id, lang, stage, int(value), actor, now)
+            for article_id, lang, stage, value, actor in changes
+        ],
+    )
+
+
+def _to_sql(value):
+    # numpy scalars (and bools) are not accepted by sqlite3
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def open_followup_store(path=DEFAULT_FOLLOWUP_DB, csv_file=None) -> FollowupStore:
+    """Open the store, importing `csv_file` the first time if the store is empty."""
+    store = FollowupStore(path)
+    if csv_file and store.is_empty() and os.path.exists(resolve_path(csv_file)):
+        count = store.import_csv(csv_file)
+        print(f"{count} articles importés depuis {csv_file}.")
+    return store
@@ -1,49 +1,35 @@
-import os.path
+import io
+import re
+from concurrent.futures import ThreadPoolExecutor
 
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.http import MediaIoBaseUpload
 
-# Scopes pour accéder à Google Docs et Google Drive
-SCOPES = [
-    "https://www.googleapis.com/auth/documents",
-    "https://www.googleapis.com/auth/drive",
-]
+from translation.drive_index import (
+    GOOGLE_DOC_MIMETYPE,
+    get_folder_index,
+    get_known_folder_index,
+)
+from translation.google_clients import (
+    credentials_manager,
+    get_drive_service,
+)
 
+# Nombre maximal d'appels dans une requête batch Drive
+DRIVE_BATCH_SIZE = 100
 
-# Fonction pour s'authentifier sur Google API
+# Contenu considéré comme HTML s'il contient au moins une balise courante
+HTML_TAG = re.compile(r"<(p|h[1-6]|div|ul|ol|li|br|strong|em|b|i|a|span|table)\b", re.I)
+
+
+# Fonction pour s'authentifier sur Google API (credentials partagés par le processus)
 def google_authenticate():
-    creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "google_credentials.json", SCOPES
-            )
-            creds = flow.run_local_server(port=8080)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
-    return creds
+    return credentials_manager.get()
 
 
 # Fonction pour vérifier si le document existe déjà dans un dossier Google Drive
 def document_exists(service_drive, folder_id, document_title):
-    # Échapper correctement les guillemets simples (apostrophes) dans le titre
-    escaped_title = document_title.replace("'", "\\'")
-
-    # Construire la requête pour chercher un fichier avec le même nom dans le dossier
-    query = f"'{folder_id}' in parents and name = '{escaped_title}' and mimeType = 'application/vnd.google-apps.document'"
-
-    # Exécuter la requête
-    results = service_drive.files().list(q=query, fields="files(id, name)").execute()
-    files = results.get("files", [])
-
-    # Vérification de l'existence du fichier
-    if files:
+    # Consulter l'index local du dossier plutôt qu'une requête files.list par document
+    if get_folder_index(service_drive, folder_id).exists(document_title):
         print(f"Le document '{document_title}' existe déjà dans le dossier.")
         return True
     return False
@@ -56,6 +42,7 @@ def create_google_doc(service_docs, service_drive, folder_id, document_title, co
         document = {"title": document_title}
         doc = service_docs.documents().create(body=document).execute()
         document_id = doc["documentId"]
+        get_folder_index(service_drive, folder_id).add(document_id, document_title)
 
         # Déplacer le document dans le dossier spécifié
         file = service_drive.files().get(fileId=document_id, fields="parents").execute()
@@ -86,9 +73,48 @@ def create_google_doc(service_docs, service_drive, folder_id, document_title, co
         print(f"Document '{document_title}' non créé car il existe déjà.")
 
 
+# Créer un Google Doc directement dans le dossier, avec son contenu, en un seul appel
+def upload_google_doc(service_drive, folder_id, document_title, content):
+    """
+    Crée le document en un seul appel Drive `files.create` : le contenu (HTML ou
+    texte brut) est converti en Google Doc et placé directement dans le dossier.
+    La mise en forme HTML (titres, listes, gras...) est conservée.
+
+    :param service_drive: Service Google Drive authentifié.
+    :param folder_id: ID du dossier de destination.
+    :param document_title: Titre du document.
+    :param content: Contenu HTML ou texte du document.
+    :return: L'ID du document créé, ou None s'il existait déjà.
+    """
+    if document_exists(service_drive, folder_id, document_title):
+        print(f"Document '{document_title}' non créé car il existe déjà.")
+        return None
+
+    content = content if isinstance(content, str) else ""
+    mimetype = "text/html" if HTML_TAG.search(content) else "text/plain"
+    media = MediaIoBaseUpload(
+        io.BytesIO(content.encode("utf-8")), mimetype=mimetype, resumable=False
+    )
+    file = (
+        service_drive.files()
+        .create(
+            body={
+                "name": document_title,
+                "mimeType": GOOGLE_DOC_MIMETYPE,
+                "parents": [folder_id],
+            },
+            media_body=media,
+            fields="id",
+        )
+        .execute()
+    )
+    get_folder_index(service_drive, folder_id).add(file["id"], document_title)
+    print(f"Document '{document_title}' créé avec succès dans le dossier.")
+    return file["id"]
+
+
 def save_df_to_gdrive(creds, df, lang_code):
-    service_docs = build("docs", "v1", credentials=creds)
-    service_drive = build("drive", "v3", credentials=creds)
+    service_drive = get_drive_service(creds)
 
     if lang_code == "es":
         folder_id = "1KpNvszabc4KuI0AXbaA-dKuDdSQFeYsW"
@@ -103,21 +129,15 @@ def save_df_to_gdrive(creds, df, lang_code):
         doc_content = row["content"]
 
         # Créer un document Google Docs dans le dossier spécifié
-        create_google_doc(
-            service_docs, service_drive, folder_id, doc_title, doc_content
-        )
+        upload_google_doc(service_drive, folder_id, doc_title, doc_content)
 
         # Create document with translated title and content
         doc_title_translated = f"{row['id']}_{row['title_' + lang_code]}"
         doc_content_translated = row["content_" + lang_code]
 
         # Créer un document Google Docs dans le dossier spécifié
-        create_google_doc(
-            service_docs,
-            service_drive,
-            folder_id,
-            doc_title_translated,
-            doc_content_translated,
+        upload_google_doc(
+            service_drive, folder_id, doc_title_translated, doc_content_translated
         )
 
 
@@ -131,14 +151,8 @@ def get_files_by_docid_prefix(service_drive, docid, old_folder_id):
     :return: Une liste de fichiers (ID et nom) correspondant au critère de recherche.
     """
     try:
-        # Construire la requête pour chercher les fichiers dont le nom commence par 'docid_'
-        query = f"name contains '{docid}_' and mimeType = 'application/vnd.google-apps.document' and '{old_folder_id}' in parents"
-        print(query)
-        # Exécuter la requête
-        results = (
-            service_drive.files().list(q=query, fields="files(id, name)").execute()
-        )
-        files = results.get("files", [])
+        # Chercher dans l'index local du dossier (un seul listing partagé)
+        files = get_folder_index(service_drive, old_folder_id).files_with_prefix(docid)
 
         # Afficher les fichiers trouvés
         if files:
@@ -177,6 +191,15 @@ def move_file(service_drive, file_id, old_folder_id, new_folder_id):
             fields="id, parents",
         ).execute()
 
+        # Mettre à jour les index des deux dossiers
+        index = get_known_folder_index(old_folder_id)
+        name = index.name(file_id) if index is not None else None
+        if index is not None:
+            index.remove(file_id)
+        index = get_known_folder_index(new_folder_id)
+        if index is not None and name is not None:
+            index.add(file_id, name)
+
         print(
             f"Le fichier avec l'ID {file_id} a été déplacé dans le dossier {new_folder_id}."
         )
@@ -184,6 +207,19 @@ def move_file(service_drive, file_id, old_folder_id, new_folder_id):
         print(f"Erreur lors du déplacement du fichier {file_id} : {e}")
 
 
+# Dossiers "à relire" et "relus" pour une langue
+def get_review_folders(lang_code):
+    if lang_code == "es":
+        old_folder_id = "1KpNvszabc4KuI0AXbaA-dKuDdSQFeYsW"
+        # "1yqvCEsF55Zntbc__Oz89-mCgvBO0GRIj"
+        new_folder_id = "1DHIycvGv7H5Jtfdempe_Y7455pIxnWrN"
+    if lang_code == "en":
+        old_folder_id = "1KpNvszabc4KuI0AXbaA-dKuDdSQFeYsW"
+        "1YCSmqQtV41IDWcABtxG_ADO-TWynCtlX"
+        new_folder_id = "1DHIycvGv7H5Jtfdempe_Y7455pIxnWrN"
+    return old_folder_id, new_folder_id
+
+
 # Utilisation des fonctions
 def move_files_by_docid(creds, docid, lang_code):
     """
@@ -191,27 +227,94 @@ def move_files_by_docid(creds, docid, lang_code):
 
     :param creds: Credentials d'authentification Google.
     :param docid: Le docid à rechercher.
-    :param old_folder_id: ID du dossier source.
-    :param new_folder_id: ID du dossier de destination.
+    :param lang_code: Langue des documents (choisit les dossiers source et destination).
     """
+    result = move_files_by_docids(creds, [docid], lang_code)[docid]
+    for error in result["errors"]:
+        print(f"Erreur lors du déplacement du fichier : {error}")
+
+
+def _move_batch(creds, files, old_folder_id, new_folder_id):
+    # Un seul aller-retour HTTP pour tout le lot (requête batch Drive)
+    service_drive = get_drive_service(creds)
+    errors = {}
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            errors[request_id] = str(exception)
+
+    batch = service_drive.new_batch_http_request(callback=callback)
+    for file in files:
+        batch.add(
+            service_drive.files().update(
+                fileId=file["id"],
+                addParents=new_folder_id,
+                removeParents=old_folder_id,
+                fields="id, parents",
+            ),
+            request_id=file["id"],
+        )
+    batch.execute()
+    return errors
 
-    if lang_code == "es":
-        old_folder_id = "1KpNvszabc4KuI0AXbaA-dKuDdSQFeYsW"
-        # "1yqvCEsF55Zntbc__Oz89-mCgvBO0GRIj"
-        new_folder_id = "1DHIycvGv7H5Jtfdempe_Y7455pIxnWrN"
-    if lang_code == "en":
-        old_folder_id = "1KpNvszabc4KuI0AXbaA-dKuDdSQFeYsW"
-        "1YCSmqQtV41IDWcABtxG_ADO-TWynCtlX"
-        new_folder_id = "1DHIycvGv7H5Jtfdempe_Y7455pIxnWrN"
 
-    # Initialiser le service Google Drive
-    service_drive = build("drive", "v3", credentials=creds)
+def move_files_by_docids(creds, docids, lang_code, max_concurrency=4):
+    """
+    Déplace d'un coup les fichiers de plusieurs docids vers le dossier "relus".
 
-    # Récupérer les fichiers avec le préfixe 'docid_'
-    files = get_files_by_docid_prefix(service_drive, docid, old_folder_id)
-    print(files)
+    Les fichiers sont trouvés dans l'index du dossier source (un seul listing),
+    puis déplacés par requêtes batch Drive de DRIVE_BATCH_SIZE fichiers, avec
+    au plus `max_concurrency` lots en parallèle.
 
-    # Si des fichiers sont trouvés, les déplacer
-    if files:
-        for file in files:
-            move_file(service_drive, file["id"], old_folder_id, new_folder_id)
+    :param creds: Credentials d'authentification Google.
+    :param docids: Les docids à déplacer.
+    :param lang_code: Langue des documents (choisit les dossiers source et destination).
+    :param max_concurrency: Nombre de requêtes batch envoyées en même temps.
+    :return: {docid: {"moved": [noms], "errors": [messages]}}
+    """
+    old_folder_id, new_folder_id = get_review_folders(lang_code)
+    old_index = get_folder_index(get_drive_service(creds), old_folder_id)
+    old_index.refresh(force=True)
+
+    results = {docid: {"moved": [], "errors": []} for docid in docids}
+    files = []
+    for docid in docids:
+        docid_files = old_index.files_with_prefix(docid)
+        if not docid_files:
+            results[docid]["errors"].append(
+                f"Aucun fichier trouvé avec le préfixe '{docid}_' dans le dossier {old_folder_id}."
+            )
+        files.extend({**file, "docid": docid} for file in docid_files)
+
+    batches = [
+        files[start : start + DRIVE_BATCH_SIZE]
+        for start in range(0, len(files), DRIVE_BATCH_SIZE)
+    ]
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = [
+            executor.submit(_move_batch, creds, batch, old_folder_id, new_folder_id)
+            for batch in batches
+        ]
+        for batch, future in zip(batches, futures):
+            try:
+                errors.update(future.result())
+            except Exception as e:
+                errors.update({file["id"]: str(e) for file in batch})
+
+    # Résultat par docid et mise à jour des index des deux dossiers
+    new_index = get_known_folder_index(new_folder_id)
+    for file in files:
+        if file["id"] in errors:
+            results[file["docid"]]["errors"].append(
+                f"{file['name']} : {errors[file['id']]}"
+            )
+            continue
+        old_index.remove(file["id"])
+        if new_index is not None:
+            new_index.add(file["id"], file["name"])
+        results[file["docid"]]["moved"].append(file["name"])
+        print(
+            f"Le fichier {file['name']} a été déplacé dans le dossier {new_folder_id}."
+        )
+    return results
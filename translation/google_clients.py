@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build
+
+# Scopes pour accéder à Google Docs et Google Drive
+SCOPES = [
+    "https://www.googleapis.com/auth/documents",
+    "https://www.googleapis.com/auth/drive",
+]
+
+TOKEN_FILE = "token.json"
+CLIENT_SECRETS_FILE = "google_credentials.json"
+
+# Le jeton est rafraîchi en tâche de fond quand il expire dans moins de 5 minutes
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Après un échec, attente avant de retenter le rafraîchissement, doublée à chaque
+# nouvel échec consécutif
+REFRESH_RETRY_DELAY = timedelta(seconds=30)
+REFRESH_RETRY_MAX_DELAY = timedelta(minutes=10)
+
+
+class CredentialsManager:
+    """
+    Credentials Google partagés par tout le processus.
+
+    token.json n'est lu qu'une fois ; le jeton est rafraîchi en tâche de fond
+    avant son expiration, sans bloquer les requêtes (avec une attente croissante
+    entre deux essais après un échec), et token.json n'est
+    réécrit qu'après un rafraîchissement. Le rafraîchissement se fait sur une
+    copie des credentials, qui remplace l'originale sous le verrou : les
+    requêtes en cours ne voient jamais un jeton à moitié mis à jour.
+    """
+
+    def __init__(
+        self,
+        token_file=TOKEN_FILE,
+        client_secrets_file=CLIENT_SECRETS_FILE,
+        refresh_margin=REFRESH_MARGIN,
+    ):
+        self.token_file = token_file
+        self.client_secrets_file = client_secrets_file
+        self.refresh_margin = refresh_margin
+        self._creds = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        # Heure du dernier échec de rafraîchissement et nombre d'échecs consécutifs
+        self._failed_at = None
+        self._failures = 0
+
+    def _save(self, creds):
+        # Écriture atomique : un autre processus ne lit jamais un fichier à moitié écrit
+        tmp_file = f"{self.token_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w") as token:
+            token.write(creds.to_json())
+        os.replace(tmp_file, self.token_file)
+
+    def _load(self):
+        creds = None
+        if os.path.exists(self.token_file):
+            creds = Credentials.from_authorized_user_file(self.token_file, SCOPES)
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                flow = InstalledAppFlow.from_client_secrets_file(
+                    self.client_secrets_file, SCOPES
+                )
+                creds = flow.run_local_server(port=8080)
+            self._save(creds)
+        return creds
+
+    def _expires_soon(self, creds) -> bool:
+        if creds.expiry is None:
+            return False
+        # google-auth stocke l'expiration en UTC sans fuseau
+        expiry = creds.expiry.replace(tzinfo=timezone.utc)
+        return expiry - datetime.now(timezone.utc) < self.refresh_margin
+
+    def _refreshed_copy(self, creds):
+        # Nouveaux credentials rafraîchis (None en cas d'erreur), `creds` n'est pas modifié
+        try:
+            new_creds = Credentials.from_authorized_user_info(
+                json.loads(creds.to_json()), SCOPES
+            )
+            new_creds.refresh(Request())
+            self._save(new_creds)
+            return new_creds
+        except Exception as e:
+            print(f"Erreur lors du rafraîchissement du jeton Google : {e}")
+            return None
+
+    def _retry_delay(self) -> timedelta:
+        return min(
+            REFRESH_RETRY_DELAY * 2 ** max(self._failures - 1, 0),
+            REFRESH_RETRY_MAX_DELAY,
+        )
+
+    def _record_refresh(self, new_creds):
+        # À appeler sous le verrou : note le succès ou l'échec du rafraîchissement
+        if new_creds is not None:
+            self._failed_at = None
+            self._failures = 0
+            return
+        self._failed_at = datetime.now(timezone.utc)
+        self._failures += 1
+        print(
+            f"Échec n°{self._failures} du rafraîchissement du jeton Google, "
+            f"nouvel essai dans {self._retry_delay().total_seconds():.0f} s"
+        )
+
+    def _backing_off(self) -> bool:
+        return (
+            self._failed_at is not None
+            and datetime.now(timezone.utc) - self._failed_at < self._retry_delay()
+        )
+
+    def _refresh_in_background(self, creds):
+        new_creds = self._refreshed_copy(creds)
+        with self._lock:
+            if new_creds is not None and self._creds is creds:
+                self._creds = new_creds
+            self._record_refresh(new_creds)
+            self._refreshing = False
+
+    def get(self) -> Credentials:
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load()
+            creds = self._creds
+            if not creds.valid:
+                # Jeton déjà expiré : il faut attendre le rafraîchissement
+                new_creds = self._refreshed_copy(creds)
+                self._record_refresh(new_creds)
+                if new_creds is not None:
+                    self._creds = creds = new_creds
+            elif (
+                self._expires_soon(creds)
+                and not self._refreshing
+                and not self._backing_off()
+            ):
+                # Pas de nouvel essai en tâche de fond avant la fin de l'attente
+                # qui suit un échec : le jeton actuel reste valide d'ici là
+                self._refreshing = True
+                threading.Thread(
+                    target=self._refresh_in_background, args=(creds,), daemon=True
+                ).start()
+            return creds
+
+
+credentials_manager = CredentialsManager()
+
+# httplib2 n'est pas thread-safe : un service de chaque type par thread
+_services = threading.local()
+
+
+def get_service(name, version, creds=None):
+    """
+    Service Google API (`build(name, version)`) mis en cache pour le thread
+    courant, construit avec les credentials partagés par défaut.
+    """
+    creds = creds if creds is not None else credentials_manager.get()
+    cache = getattr(_services, "cache", None)
+    if cache is None:
+        cache = _services.cache = {}
+    # Reconstruit quand les credentials ont été remplacés par un rafraîchissement
+    cached_creds, service = cache.get((name, version), (None, None))
+    if cached_creds is not creds:
+        service = build(name, version, credentials=creds, cache_discovery=False)
+        cache[name, version] = (creds, service)
+    return service
+
+
+def get_drive_service(creds=None):
+    return get_service("drive", "v3", creds)
+
+
+def get_docs_service(creds=None):
+    return get_service("docs", "v1", creds)
@@ -0,0 +1,154 @@
+import json
+import os
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from translation.sqlite_store import SQLiteStore
+
+DEFAULT_JOBS_DB = "./data/jobs.sqlite"
+
+JOB_COLUMNS = (
+    "id",
+    "kind",
+    "username",
+    "status",
+    "done",
+    "total",
+    "message",
+    "error",
+    "result",
+    "pid",
+    "created_at",
+    "updated_at",
+)
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue(SQLiteStore):
+    """
+    Local worker pool for long tasks started from the dashboards.
+
+    Jobs run in a thread pool of the process that accepted them, and their
+    status is kept in SQLite so that any Flask worker can answer the polls.
+    Statuses: queued -> running -> succeeded | failed.
+    """
+
+    def __init__(self, path=DEFAULT_JOBS_DB, max_workers=2):
+        super().__init__(path)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    username TEXT,
+                    status TEXT NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    error TEXT,
+                    result TEXT,
+                    pid INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_username ON jobs (username, created_at)"
+            )
+            # Jobs of a process that died will never finish
+            unfinished = conn.execute(
+                "SELECT id, pid FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            for job_id, pid in unfinished:
+                if not _pid_alive(pid):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        ("Interrompu (redémarrage du serveur).", time.time(), job_id),
+                    )
+
+    def submit(self, kind, username, fn, *args, **kwargs) -> str:
+        """
+        Run `fn(*args, progress=..., **kwargs)` in the pool and return the job id.
+
+        `progress(done, total, message=None)` can be called by `fn` to report
+        its progress; the return value of `fn` is stored as JSON.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, username, status, pid, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, username, os.getpid(), now, now),
+            )
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _update(self, job_id, **values):
+        values["updated_at"] = time.time()
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self._transaction() as conn:
+            conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                [*values.values(), job_id],
+            )
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status="running")
+
+        def progress(done, total, message=None):
+            values = {"done": done, "total": total}
+            if message is not None:
+                values["message"] = message
+            self._update(job_id, **values)
+
+        try:
+            result = fn(*args, progress=progress, **kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status="failed", error=str(e))
+            return
+        self._update(job_id, status="succeeded", result=json.dumps(result, default=str))
+
+    def _to_dict(self, row):
+        job = dict(zip(JOB_COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def get(self, job_id):
+        row = (
+            self._connection()
+            .execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            )
+            .fetchone()
+        )
+        return None if row is None else self._to_dict(row)
+
+    def list(self, username=None, limit=20) -> list:
+        if username is None:
+            query, params = "", ()
+        else:
+            query, params = "WHERE username = ?", (username,)
+        rows = (
+            self._connection()
+            .execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs {query} ORDER BY created_at DESC LIMIT ?",
+                (*params, limit),
+            )
+            .fetchall()
+        )
+        return [self._to_dict(row) for row in rows]
@@ -0,0 +1,52 @@
+# Languages the articles can be translated from / into: code -> English name,
+# as written in the prompts
+LANGUAGES = {
+    "fr": "French",
+    "en": "English",
+    "es": "Spanish",
+    "de": "German",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "nl": "Dutch",
+    "pl": "Polish",
+    "ro": "Romanian",
+    "ar": "Arabic",
+    "zh": "Chinese",
+    "ja": "Japanese",
+}
+
+# Names shown in the dashboards
+LANGUAGE_LABELS = {
+    "fr": "🇫🇷 Français",
+    "en": "🇬🇧 Anglais",
+    "es": "🇪🇸 Espagnol",
+    "de": "🇩🇪 Allemand",
+    "it": "🇮🇹 Italien",
+    "pt": "🇵🇹 Portugais",
+    "nl": "🇳🇱 Néerlandais",
+    "pl": "🇵🇱 Polonais",
+    "ro": "🇷🇴 Roumain",
+    "ar": "🇸🇦 Arabe",
+    "zh": "🇨🇳 Chinois",
+    "ja": "🇯🇵 Japonais",
+}
+
+
+def language_name(code) -> str:
+    try:
+        return LANGUAGES[code]
+    except KeyError:
+        raise KeyError(
+            f"Unknown language {code!r}: add it to translation.languages.LANGUAGES"
+        ) from None
+
+
+def language_label(code) -> str:
+    return LANGUAGE_LABELS.get(code, code)
+
+
+def check_language(code) -> str:
+    """The code if it is a known language, otherwise a ValueError."""
+    if code not in LANGUAGES:
+        raise ValueError(f"Unknown language {code!r}")
+    return code
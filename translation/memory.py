@@ -0,0 +1,219 @@
+import hashlib
+import re
+import time
+import unicodedata
+
+import pandas as pd
+
+from translation.sqlite_store import SQLiteStore
+from translation.telemetry import count_words
+
+DEFAULT_MEMORY_DB = "./data/translation_memory.sqlite"
+
+WHITESPACE = re.compile(r"\s+")
+
+REUSE_COLUMNS = (
+    "article_id",
+    "target_language",
+    "segments",
+    "exact",
+    "words",
+    "reused_words",
+    "updated_at",
+)
+
+
+def normalize_segment(text) -> str:
+    # Same segment whatever the surrounding / repeated whitespace
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def segment_hash(text) -> str:
+    return hashlib.sha256(normalize_segment(text).encode("utf-8")).hexdigest()
+
+
+class TranslationMemory(SQLiteStore):
+    """
+    Segment-level translation memory: the paragraphs / HTML blocks translated
+    for each article, looked up by normalized hash (exact match).
+
+    Translations are stored as drafts when the model returns them and only
+    reused once the article has been reviewed (see `approve`), so that the
+    disclaimers, calls to action and headings shared by the articles are
+    translated once and validated once. Near matches are not looked up: a
+    segment that differs by a negation or a drug name must not be reused.
+    """
+
+    def __init__(self, path=DEFAULT_MEMORY_DB):
+        super().__init__(path)
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS segments (
+                    id INTEGER PRIMARY KEY,
+                    source_language TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    source_hash TEXT NOT NULL,
+                    source_text TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    article_id TEXT NOT NULL DEFAULT '',
+                    model TEXT,
+                    approved INTEGER NOT NULL DEFAULT 0,
+                    approved_at REAL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (source_hash, source_language, target_language, article_id)
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS segments_article ON segments (article_id, target_language)"
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS reuse (
+                    article_id TEXT NOT NULL,
+                    target_language TEXT NOT NULL,
+                    segments INTEGER NOT NULL,
+                    exact INTEGER NOT NULL,
+                    words INTEGER NOT NULL,
+                    reused_words INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (article_id, target_language)
+                )"""
+            )
+
+    def lookup(self, segments, source_language_code, target_language_code) -> list:
+        """
+        The approved translation of each segment found exactly (same
+        normalized text), None for the others.
+        """
+        matches = [None] * len(segments)
+        if not segments:
+            return matches
+        hashes = [segment_hash(segment) for segment in segments]
+        unique_hashes = list(dict.fromkeys(hashes))
+        # Exact matches in one query, the latest approval wins
+        rows = (
+            self._connection()
+            .execute(
+                f"""SELECT source_hash, translation FROM segments
+                WHERE source_language = ? AND target_language = ? AND approved = 1
+                AND source_hash IN ({", ".join("?" * len(unique_hashes))})
+                ORDER BY approved_at""",
+                (source_language_code, target_language_code, *unique_hashes),
+            )
+            .fetchall()
+        )
+        exact = dict(rows)
+        return [exact.get(source_hash) for source_hash in hashes]
+
+    def add(self, entries, source_language_code, model_name=None) -> int:
+        """
+        Store draft translations, `entries` being (segment, translation,
+        target_language_code, article_id) tuples. A segment translated again
+        for the same article replaces the previous draft or approval.
+        """
+        now = time.time()
+        added = 0
+        with self._transaction() as conn:
+            for segment, translation, target_language_code, article_id in entries:
+                article_id = "" if article_id is None else str(article_id)
+                key = (
+                    segment_hash(segment),
+                    source_language_code,
+                    target_language_code,
+                    article_id,
+                )
+                row = conn.execute(
+                    """SELECT id FROM segments WHERE source_hash = ?
+                    AND source_language = ? AND target_language = ? AND article_id = ?""",
+                    key,
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        """UPDATE segments SET translation = ?, model = ?,
+                        approved = 0, approved_at = NULL WHERE id = ?""",
+                        (translation, model_name, row[0]),
+                    )
+                    continue
+                conn.execute(
+                    """INSERT INTO segments (source_hash, source_language,
+                    target_language, article_id, source_text, translation, model,
+                    created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (*key, normalize_segment(segment), translation, model_name, now),
+                )
+                added += 1
+        return added
+
+    def approve(self, article_ids, target_language_code) -> int:
+        """Make the translations of the reviewed articles reusable."""
+        article_ids = [str(article_id) for article_id in article_ids]
+        if not article_ids:
+            return 0
+        with self._transaction() as conn:
+            return conn.execute(
+                f"""UPDATE segments SET approved = 1, approved_at = ?
+                WHERE target_language = ? AND approved = 0
+                AND article_id IN ({", ".join("?" * len(article_ids))})""",
+                (time.time(), target_language_code, *article_ids),
+            ).rowcount
+
+    def record_reuse(self, rows):
+        """Save the reuse of the last translation of each (article, language)."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO reuse VALUES ({', '.join('?' * len(REUSE_COLUMNS))})",
+                [
+                    (
+                        "" if row["article_id"] is None else str(row["article_id"]),
+                        row["target_language"],
+                        row["segments"],
+                        row["exact"],
+                        row["words"],
+                        row["reused_words"],
+                        now,
+                    )
+                    for row in rows
+                ],
+            )
+
+    def reuse_report(self, article_ids=None) -> pd.DataFrame:
+        """Segments and words reused per article and language, with the reuse rate."""
+        query, params = "", ()
+        if article_ids is not None:
+            article_ids = [str(article_id) for article_id in article_ids]
+            query = f"WHERE article_id IN ({', '.join('?' * len(article_ids))})"
+            params = article_ids
+        report = pd.read_sql_query(
+            f"SELECT {', '.join(REUSE_COLUMNS)} FROM reuse {query} ORDER BY article_id, target_language",
+            self._connection(),
+            params=params,
+        )
+        report["reuse_rate"] = (report["reused_words"] / report["words"]).where(
+            report["words"] > 0, 0.0
+        )
+        return report
+
+
+def segment_reuse(segments, matches) -> dict:
+    # Reuse counters of one text, whitespace segments left out
+    reuse = {"segments": 0, "exact": 0, "words": 0, "reused_words": 0}
+    for segment, match in zip(segments, matches):
+        if not segment.strip():
+            continue
+        words = count_words(segment)
+        reuse["segments"] += 1
+        reuse["words"] += words
+        if match is not None:
+            reuse["exact"] += 1
+            reuse["reused_words"] += words
+    return reuse
+
+
+def format_reuse(report) -> str:
+    words = int(report["words"].sum())
+    reused_words = int(report["reused_words"].sum())
+    return (
+        f"Translation memory: {reused_words}/{words} words reused "
+        f"({reused_words / words if words else 0:.0%}), "
+        f"{int(report['exact'].sum())} exact matches out of "
+        f"{int(report['segments'].sum())} segments"
+    )
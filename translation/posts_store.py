@@ -0,0 +1,167 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from translation.sqlite_store import SQLiteStore
+from translation.storage import iter_table, resolve_path
+
+DEFAULT_POSTS_DB = "./data/posts.sqlite"
+POST_COLUMNS = ("id", "title", "content")
+
+# Rows read at once when importing posts.csv, keeps memory flat
+FILE_CHUNK_SIZE = 500
+# Max number of bound parameters per "IN (...)" clause
+SQL_CHUNK_SIZE = 500
+
+
+def _content_hash(title, content) -> str:
+    return hashlib.sha1(f"{title}\x00{content}".encode("utf-8")).hexdigest()
+
+
+class PostStore(SQLiteStore):
+    """
+    Post contents keyed by id, so that the dashboards can fetch a few
+    articles without parsing the whole of posts.csv.
+    """
+
+    def __init__(self, path=DEFAULT_POSTS_DB):
+        super().__init__(path)
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS posts (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT,
+                    content TEXT,
+                    content_hash TEXT NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS posts_title ON posts (title)")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sync_state (
+                    name TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sources (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )"""
+            )
+
+    def sync(self, posts_df) -> int:
+        """
+        Upsert the rows of `posts_df` whose title or content changed.
+        Returns the number of rows written.
+        """
+        conn = self._connection()
+        written = 0
+        with self._transaction():
+            for start in range(0, len(posts_df), SQL_CHUNK_SIZE):
+                chunk = posts_df.iloc[start : start + SQL_CHUNK_SIZE]
+                ids = [int(post_id) for post_id in chunk["id"]]
+                known = dict(
+                    conn.execute(
+                        f"SELECT id, content_hash FROM posts WHERE id IN ({', '.join('?' for _ in ids)})",
+                        ids,
+                    ).fetchall()
+                )
+                rows = []
+                for post_id, title, content in zip(
+                    ids, chunk["title"], chunk["content"]
+                ):
+                    title = None if pd.isna(title) else str(title)
+                    content = None if pd.isna(content) else str(content)
+                    content_hash = _content_hash(title, content)
+                    if known.get(post_id) != content_hash:
+                        rows.append((post_id, title, content, content_hash))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?)", rows
+                )
+                written += len(rows)
+        return written
+
+    def sync_file(self, path, force=False) -> int:
+        """
+        Re-sync from the posts CSV / Parquet file when it changed since the
+        last sync (mtime/size).
+        """
+        path = resolve_path(path)
+        if not os.path.exists(path):
+            return 0
+        stat = os.stat(path)
+        conn = self._connection()
+        source = conn.execute(
+            "SELECT mtime, size FROM sources WHERE path = ?", (path,)
+        ).fetchone()
+        if not force and source == (stat.st_mtime, stat.st_size):
+            return 0
+
+        # Read by chunks so that memory does not grow with the corpus
+        written = 0
+        for chunk in iter_table(path, POST_COLUMNS, batch_size=FILE_CHUNK_SIZE):
+            written += self.sync(chunk.dropna(subset=["id"]))
+        self.mark_synced(path)
+        return written
+
+    def mark_synced(self, path):
+        # Remember the version of the file the store reflects
+        stat = os.stat(path)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                (path, stat.st_mtime, stat.st_size),
+            )
+
+    def get_watermark(self, name):
+        row = (
+            self._connection()
+            .execute("SELECT value FROM sync_state WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    def set_watermark(self, name, value):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (name, value)
+            )
+
+    def get_posts_by_titles(self, titles, columns=POST_COLUMNS) -> pd.DataFrame:
+        titles = list(titles)
+        conn = self._connection()
+        ids = []
+        for start in range(0, len(titles), SQL_CHUNK_SIZE):
+            chunk = titles[start : start + SQL_CHUNK_SIZE]
+            ids.extend(
+                row[0]
+                for row in conn.execute(
+                    f"SELECT id FROM posts WHERE title IN ({', '.join('?' for _ in chunk)}) ORDER BY id",
+                    chunk,
+                )
+            )
+        return self.get_posts(ids, columns)
+
+    def get_posts(self, ids, columns=POST_COLUMNS) -> pd.DataFrame:
+        """Posts of `ids` (in the order of the ids), reading only those rows."""
+        unknown = set(columns) - set(POST_COLUMNS)
+        if unknown:
+            raise KeyError(f"Unknown post columns: {sorted(unknown)}")
+        ids = [int(post_id) for post_id in ids]
+        selected = ", ".join(dict.fromkeys(("id", *columns)))
+        conn = self._connection()
+        rows = []
+        for start in range(0, len(ids), SQL_CHUNK_SIZE):
+            chunk = ids[start : start + SQL_CHUNK_SIZE]
+            rows.extend(
+                conn.execute(
+                    f"SELECT {selected} FROM posts WHERE id IN ({', '.join('?' for _ in chunk)})",
+                    chunk,
+                ).fetchall()
+            )
+        df = pd.DataFrame(rows, columns=list(dict.fromkeys(("id", *columns))))
+        order = {post_id: position for position, post_id in enumerate(ids)}
+        df = df.sort_values("id", key=lambda s: s.map(order)).reset_index(drop=True)
+        return df[list(columns)]
@@ -0,0 +1,223 @@
+import os
+import random
+import re
+import threading
+import time
+
+import openai
+
+from translation.sqlite_store import SQLiteStore
+
+DEFAULT_RATE_LIMIT_DB = "./data/rate_limit.sqlite"
+
+# Limits per minute of the API, learnt from the headers of the responses
+LIMIT_KINDS = ("requests", "tokens")
+
+# Retries of a rate limited / failed call, with a jittered exponential backoff
+DEFAULT_MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# Longest sleep between two checks of the buckets
+MAX_WAIT = 5.0
+
+# Errors worth a retry: rate limit, timeout, conflict and server errors
+RETRY_STATUSES = {408, 409, 429}
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+_governor = None
+_governor_configured = False
+# The first calls come from the worker threads of the translation pool
+_governor_lock = threading.Lock()
+
+
+def parse_duration(value):
+    """Seconds of an x-ratelimit-reset-* header ("1s", "6m0s", "20ms"), or None."""
+    if value is None:
+        return None
+    parts = DURATION_PART.findall(str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def _status_code(error):
+    return getattr(error, "status_code", None)
+
+
+def is_retryable(error) -> bool:
+    # A quota exhausted on the account will not come back with a retry
+    if getattr(error, "code", None) == "insufficient_quota":
+        return False
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    status_code = _status_code(error)
+    return status_code is not None and (
+        status_code in RETRY_STATUSES or status_code >= 500
+    )
+
+
+def backoff_delay(attempt) -> float:
+    # "Full jitter": spread the retries of the workers hit at the same time
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+class RateGovernor(SQLiteStore):
+    """
+    Token buckets of the OpenAI limits (requests and tokens per minute, per
+    model) shared through SQLite by every thread and process of the machine:
+    main.py, the dashboard jobs and the gunicorn workers.
+
+    The buckets are sized from the x-ratelimit-* headers of the responses
+    (no limit until the first ones come back), and a 429 blocks every caller
+    of the model until the server's reset.
+    """
+
+    def __init__(self, path=DEFAULT_RATE_LIMIT_DB):
+        super().__init__(path)
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    capacity REAL,
+                    level REAL,
+                    updated_at REAL NOT NULL,
+                    blocked_until REAL NOT NULL DEFAULT 0
+                )"""
+            )
+
+    def _bucket(self, conn, name, now) -> tuple:
+        # (capacity, level, blocked_until) of the bucket, refilled at capacity
+        # per minute. Capacity and level are None while the limit is unknown.
+        row = conn.execute(
+            "SELECT capacity, level, updated_at, blocked_until FROM buckets WHERE name = ?",
+            (name,),
+        ).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO buckets (name, updated_at) VALUES (?, ?)", (name, now)
+            )
+            return None, None, 0.0
+        capacity, level, updated_at, blocked_until = row
+        if capacity is not None:
+            level = min(capacity, level + (now - updated_at) * capacity / 60)
+        return capacity, level, blocked_until
+
+    def acquire(self, model_name, tokens=0) -> float:
+        """
+        Wait until one request of `tokens` tokens fits in the limits of the
+        model and take it from the buckets. Returns the time waited.
+        """
+        start = time.monotonic()
+        while True:
+            now = time.time()
+            with self._transaction() as conn:
+                wait = 0.0
+                levels = {}
+                for kind, needed in zip(LIMIT_KINDS, (1, tokens)):
+                    name = f"{model_name}:{kind}"
+                    capacity, level, blocked_until = self._bucket(conn, name, now)
+                    wait = max(wait, blocked_until - now)
+                    if capacity is None:
+                        continue
+                    # A request larger than the bucket would wait forever
+                    needed = min(needed, capacity)
+                    levels[name] = level - needed
+                    if level < needed:
+                        wait = max(wait, (needed - level) * 60 / capacity)
+                if wait <= 0:
+                    conn.executemany(
+                        "UPDATE buckets SET level = ?, updated_at = ? WHERE name = ?",
+                        [(level, now, name) for name, level in levels.items()],
+                    )
+                    return time.monotonic() - start
+            # Jitter, so that the waiting workers do not all wake up together
+            time.sleep(min(MAX_WAIT, wait) * random.uniform(1.0, 1.2))
+
+    def update(self, model_name, headers):
+        """Resize the buckets from the x-ratelimit-* headers of a response."""
+        if not headers:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            for kind in LIMIT_KINDS:
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if limit is None or remaining is None:
+                    continue
+                name = f"{model_name}:{kind}"
+                self._bucket(conn, name, now)
+                # The server counts the calls of every process: trust its view
+                conn.execute(
+                    "UPDATE buckets SET capacity = ?, level = ?, updated_at = ? WHERE name = ?",
+                    (float(limit), float(remaining), now, name),
+                )
+
+    def block(self, model_name, seconds):
+        """After a 429: no call of the model for `seconds`, whatever the process."""
+        now = time.time()
+        with self._transaction() as conn:
+            for kind in LIMIT_KINDS:
+                name = f"{model_name}:{kind}"
+                self._bucket(conn, name, now)
+                conn.execute(
+                    "UPDATE buckets SET blocked_until = MAX(blocked_until, ?) WHERE name = ?",
+                    (now + seconds, name),
+                )
+
+    def call(self, model_name, tokens, fn, max_retries=DEFAULT_MAX_RETRIES):
+        """
+        Run `fn()`, which returns a raw response (`with_raw_response`), within
+        the limits of the model, retrying the rate limited and transient
+        errors. Returns (raw response, number of retries).
+        """
+        for attempt in range(max_retries + 1):
+            self.acquire(model_name, tokens)
+            try:
+                raw_response = fn()
+            except Exception as e:
+                if attempt == max_retries or not is_retryable(e):
+                    raise
+                delay = backoff_delay(attempt)
+                if _status_code(e) == 429:
+                    headers = getattr(getattr(e, "response", None), "headers", {})
+                    retry_after = parse_duration(
+                        headers.get("retry-after")
+                    ) or parse_duration(headers.get("x-ratelimit-reset-requests"))
+                    self.block(model_name, max(delay, retry_after or 0))
+                else:
+                    time.sleep(delay)
+                continue
+            self.update(model_name, getattr(raw_response, "headers", None))
+            return raw_response, attempt
+
+
+def get_governor():
+    """
+    Governor shared by the model calls of translation.translation, None when
+    OPENAI_RATE_GOVERNOR=0 (the client's own retries then apply).
+    """
+    global _governor, _governor_configured
+    if _governor_configured:
+        return _governor
+    with _governor_lock:
+        if not _governor_configured:
+            if os.getenv("OPENAI_RATE_GOVERNOR", "1") == "1":
+                path = os.getenv("OPENAI_RATE_LIMIT_DB", DEFAULT_RATE_LIMIT_DB)
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                _governor = RateGovernor(path)
+            _governor_configured = True
+        return _governor
+
+
+def set_governor(governor):
+    # Replace the shared governor (another file, or None to disable it)
+    global _governor, _governor_configured
+    with _governor_lock:
+        _governor = governor
+        _governor_configured = True
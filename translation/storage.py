@@ -0,0 +1,102 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for the Parquet files
+    pq = None
+
+# Format of the files written by main.py and the dashboards ("csv" or "parquet")
+DATA_FORMAT = os.getenv("DATA_FORMAT", "csv")
+
+# Rows per batch when streaming a file
+BATCH_SIZE = 500
+
+
+def _require_pyarrow():
+    if pq is None:
+        raise ImportError("pyarrow is required to read or write Parquet files")
+
+
+def resolve_path(path) -> str:
+    """
+    `path` itself if it exists, else its Parquet / CSV sibling, so that callers
+    keep working once a CSV has been converted with convert_to_parquet.py.
+    """
+    if os.path.exists(path):
+        return path
+    root, ext = os.path.splitext(path)
+    for sibling in (root + ".parquet", root + ".csv"):
+        if os.path.exists(sibling):
+            return sibling
+    return path
+
+
+def with_format(path, data_format=None) -> str:
+    # "./data/x.csv" -> "./data/x.parquet" when writing Parquet
+    root, _ = os.path.splitext(path)
+    return f"{root}.{data_format or DATA_FORMAT}"
+
+
+def read_table(path, columns=None, ids=None, id_column="id") -> pd.DataFrame:
+    """
+    Read a CSV or Parquet file, keeping only `columns` and the rows whose
+    `id_column` is in `ids`. With Parquet, the projection and the id filter
+    are applied while reading and the other columns are never decoded.
+    """
+    path = resolve_path(path)
+    columns = list(columns) if columns is not None else None
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        filters = [(id_column, "in", list(ids))] if ids is not None else None
+        return pd.read_parquet(path, columns=columns, filters=filters)
+
+    if ids is None:
+        return pd.read_csv(path, usecols=columns)
+    ids = set(ids)
+    usecols = None if columns is None else list(dict.fromkeys([*columns, id_column]))
+    chunks = [
+        chunk[chunk[id_column].isin(ids)]
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=BATCH_SIZE)
+    ]
+    if not chunks:
+        # File without rows: empty frame with the columns of its header
+        df = pd.read_csv(path, usecols=usecols, nrows=0)
+    else:
+        df = pd.concat(chunks, ignore_index=True)
+    return df if columns is None else df[columns]
+
+
+def iter_table(path, columns=None, batch_size=BATCH_SIZE):
+    """Stream a CSV or Parquet file as DataFrames of `batch_size` rows."""
+    path = resolve_path(path)
+    columns = list(columns) if columns is not None else None
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=batch_size, columns=columns
+        ):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=batch_size)
+
+
+def write_table(df, path, data_format=None) -> str:
+    """Write `df` as CSV or Parquet (per `data_format`), returns the path written."""
+    path = with_format(path, data_format)
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def convert_csv_to_parquet(csv_file, remove_csv=False) -> str:
+    _require_pyarrow()
+    df = pd.read_csv(csv_file, low_memory=False)
+    parquet_file = write_table(df, csv_file, "parquet")
+    if remove_csv:
+        os.remove(csv_file)
+    return parquet_file
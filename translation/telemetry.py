@@ -0,0 +1,365 @@
+import contextvars
+import re
+import time
+import uuid
+from contextlib import contextmanager
+
+from translation.sqlite_store import SQLiteStore
+
+DEFAULT_TELEMETRY_DB = "./data/telemetry.sqlite"
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+# Price of the Batch API requests, relative to MODEL_PRICES
+BATCH_DISCOUNT = 0.5
+
+HTML_TAG = re.compile(r"<[^>]+>")
+
+# (store, run_id, username) of the run in progress, see telemetry_run
+_current_run = contextvars.ContextVar("telemetry_run", default=None)
+
+CALL_COLUMNS = (
+    "run_id",
+    "username",
+    "article_id",
+    "model",
+    "prompt_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "words",
+    "latency",
+    "retries",
+    "cache_hit",
+    "batch",
+    "error",
+    "created_at",
+)
+
+# Summed per model by TelemetryStore._aggregate, in the order of its query
+TOTAL_COLUMNS = (
+    "calls",
+    "cache_hits",
+    "errors",
+    "retries",
+    "prompt_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "words",
+    "timed_calls",
+    "latency_total",
+)
+
+
+def count_words(text) -> int:
+    # Words of the source text, HTML tags excluded
+    if not isinstance(text, str):
+        return 0
+    return len(HTML_TAG.sub(" ", text).split())
+
+
+def usage_tokens(usage) -> tuple:
+    """(prompt, completion, cached) tokens of a response usage, object or dict."""
+    if usage is None:
+        return 0, 0, 0
+    if isinstance(usage, dict):
+        details = usage.get("prompt_tokens_details") or {}
+        cached = details.get("cached_tokens")
+        return (
+            usage.get("prompt_tokens") or 0,
+            usage.get("completion_tokens") or 0,
+            cached or 0,
+        )
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, cached or 0
+
+
+def call_cost(model, prompt_tokens, completion_tokens, cached_tokens, batch=False):
+    # None when the price of the model is unknown
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return None
+    input_price, cached_price, output_price = prices
+    cost = (
+        (prompt_tokens - cached_tokens) * input_price
+        + cached_tokens * cached_price
+        + completion_tokens * output_price
+    ) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+class TelemetryStore(SQLiteStore):
+    """
+    One row per model call (or translation cache hit), grouped in runs: a
+    run of main.py or a translation job of the dashboard.
+    """
+
+    def __init__(self, path=DEFAULT_TELEMETRY_DB):
+        super().__init__(path)
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS runs (
+                    id TEXT PRIMARY KEY,
+                    username TEXT,
+                    kind TEXT,
+                    started_at REAL NOT NULL,
+                    finished_at REAL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS calls (
+                    run_id TEXT,
+                    username TEXT,
+                    article_id TEXT,
+                    model TEXT,
+                    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+                    completion_tokens INTEGER NOT NULL DEFAULT 0,
+                    cached_tokens INTEGER NOT NULL DEFAULT 0,
+                    words INTEGER NOT NULL DEFAULT 0,
+                    latency REAL,
+                    retries INTEGER NOT NULL DEFAULT 0,
+                    cache_hit INTEGER NOT NULL DEFAULT 0,
+                    batch INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS calls_run ON calls (run_id)")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS calls_username ON calls (username)"
+            )
+
+    def start_run(self, username=None, kind=None) -> str:
+        run_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO runs (id, username, kind, started_at) VALUES (?, ?, ?, ?)",
+                (run_id, username, kind, time.time()),
+            )
+        return run_id
+
+    def finish_run(self, run_id):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE id = ?", (time.time(), run_id)
+            )
+
+    def record(self, **call):
+        call.setdefault("created_at", time.time())
+        columns = [column for column in CALL_COLUMNS if column in call]
+        with self._transaction() as conn:
+            conn.execute(
+                f"INSERT INTO calls ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                [call[column] for column in columns],
+            )
+
+    def _aggregate(self, where="", params=()) -> dict:
+        # Totals of the matching calls, cost computed per model (and per API:
+        # the Batch API requests cost less)
+        rows = (
+            self._connection()
+            .execute(
+                f"""SELECT model, batch, COUNT(*), SUM(cache_hit), SUM(error IS NOT NULL),
+                    SUM(retries), SUM(prompt_tokens), SUM(completion_tokens),
+                    SUM(cached_tokens), SUM(words), COUNT(latency), SUM(latency), MAX(latency)
+                FROM calls {where} GROUP BY model, batch""",
+                params,
+            )
+            .fetchall()
+        )
+        summary = {
+            "calls": 0,
+            "cache_hits": 0,
+            "errors": 0,
+            "retries": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "cached_tokens": 0,
+            "words": 0,
+            "timed_calls": 0,
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+            "cost_usd": 0.0,
+            "models": [],
+        }
+        for model, batch, *totals, latency_max in rows:
+            totals = dict(zip(TOTAL_COLUMNS, (value or 0 for value in totals)))
+            for name, value in totals.items():
+                summary[name] += value
+            summary["latency_max"] = max(summary["latency_max"], latency_max or 0)
+            cost = call_cost(
+                model,
+                totals["prompt_tokens"],
+                totals["completion_tokens"],
+                totals["cached_tokens"],
+                batch,
+            )
+            if cost is None:
+                summary["cost_usd"] = None
+            elif summary["cost_usd"] is not None:
+                summary["cost_usd"] += cost
+            if model is not None and model not in summary["models"]:
+                summary["models"].append(model)
+
+        # Batch API requests have no latency of their own
+        timed_calls = summary.pop("timed_calls")
+        summary["latency_avg"] = (
+            summary["latency_total"] / timed_calls if timed_calls else None
+        )
+        summary["cost_per_1k_words"] = (
+            summary["cost_usd"] * 1000 / summary["words"]
+            if summary["cost_usd"] is not None and summary["words"]
+            else None
+        )
+        return summary
+
+    def _with_throughput(self, summary, duration) -> dict:
+        summary["duration"] = duration
+        summary["words_per_minute"] = (
+            summary["words"] * 60 / duration if duration else None
+        )
+        return summary
+
+    def run_summary(self, run_id) -> dict:
+        run = (
+            self._connection()
+            .execute(
+                "SELECT username, kind, started_at, finished_at FROM runs WHERE id = ?",
+                (run_id,),
+            )
+            .fetchone()
+        )
+        if run is None:
+            return None
+        username, kind, started_at, finished_at = run
+        summary = self._aggregate("WHERE run_id = ?", (run_id,))
+        summary.update(
+            run_id=run_id, username=username, kind=kind, started_at=started_at
+        )
+        return self._with_throughput(summary, (finished_at or time.time()) - started_at)
+
+    def runs(self, username=None, limit=20) -> list:
+        if username is None:
+            query, params = "", ()
+        else:
+            query, params = "WHERE username = ?", (username,)
+        run_ids = (
+            self._connection()
+            .execute(
+                f"SELECT id FROM runs {query} ORDER BY started_at DESC LIMIT ?",
+                (*params, limit),
+            )
+            .fetchall()
+        )
+        return [self.run_summary(run_id) for (run_id,) in run_ids]
+
+    def user_summary(self, username) -> dict:
+        # Duration: sum of the durations of the finished runs of the user
+        (duration,) = (
+            self._connection()
+            .execute(
+                "SELECT SUM(finished_at - started_at) FROM runs WHERE username = ? AND finished_at IS NOT NULL",
+                (username,),
+            )
+            .fetchone()
+        )
+        summary = self._aggregate("WHERE username = ?", (username,))
+        summary["username"] = username
+        return self._with_throughput(summary, duration)
+
+    def usernames(self) -> list:
+        rows = (
+            self._connection()
+            .execute(
+                "SELECT DISTINCT username FROM runs WHERE username IS NOT NULL ORDER BY username"
+            )
+            .fetchall()
+        )
+        return [username for (username,) in rows]
+
+
+@contextmanager
+def telemetry_run(store, username=None, kind=None):
+    """
+    Record the model calls made inside the block (in this thread and in the
+    pools started with `in_current_run`) as one run. Yields the run id.
+    """
+    run_id = store.start_run(username, kind)
+    token = _current_run.set((store, run_id, username))
+    try:
+        yield run_id
+    finally:
+        _current_run.reset(token)
+        store.finish_run(run_id)
+
+
+def in_current_run(fn):
+    # Worker threads do not inherit the context: bind the current run to `fn`
+    context = contextvars.copy_context()
+    return lambda *args: context.copy().run(fn, *args)
+
+
+def record_call(
+    model,
+    article_id=None,
+    usage=None,
+    words=0,
+    latency=None,
+    retries=0,
+    cache_hit=False,
+    batch=False,
+    error=None,
+):
+    """Record a model call in the current run, if any."""
+    current = _current_run.get()
+    if current is None:
+        return
+    store, run_id, username = current
+    prompt_tokens, completion_tokens, cached_tokens = usage_tokens(usage)
+    try:
+        store.record(
+            run_id=run_id,
+            username=username,
+            article_id=None if article_id is None else str(article_id),
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
+            words=words,
+            latency=latency,
+            retries=retries,
+            cache_hit=int(cache_hit),
+            batch=int(batch),
+            error=None if error is None else str(error),
+        )
+    except Exception as e:
+        # The telemetry must never make a translation fail
+        print(f"Telemetry error: {e}")
+
+
+def format_summary(summary) -> str:
+    cost = summary["cost_usd"]
+    lines = [
+        f"Calls: {summary['calls']} ({summary['cache_hits']} from the cache, "
+        f"{summary['errors']} errors, {summary['retries']} retries)",
+        f"Tokens: {summary['prompt_tokens']} prompt ({summary['cached_tokens']} cached), "
+        f"{summary['completion_tokens']} completion",
+        f"Words: {summary['words']}",
+    ]
+    if summary["latency_avg"] is not None:
+        lines.append(
+            f"Latency: {summary['latency_avg']:.2f}s avg, {summary['latency_max']:.2f}s max"
+        )
+    if summary.get("words_per_minute") is not None:
+        lines.append(
+            f"Throughput: {summary['words_per_minute']:.0f} words/min over {summary['duration']:.0f}s"
+        )
+    if cost is not None:
+        lines.append(f"Cost: ${cost:.4f}")
+    if summary["cost_per_1k_words"] is not None:
+        lines.append(f"Cost per 1k words: ${summary['cost_per_1k_words']:.4f}")
+    return "\n".join(lines)
@@ -1,37 +1,830 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 
+from translation.cache import make_cache_key
+from translation.chunking import (
+    DEFAULT_CHUNK_TOKENS,
+    count_tokens,
+    join_chunks,
+    split_into_chunks,
+    split_into_segments,
+)
+from translation.languages import language_name
+from translation.memory import segment_reuse
+from translation.rate_limit import get_governor
+from translation.telemetry import count_words, in_current_run, record_call
 
-def translate_text_with_openai(
+# Bump when the prompt changes so that cached translations are not reused
+PROMPT_VERSION = "1"
+
+# Number of OpenAI requests in flight at the same time
+DEFAULT_MAX_WORKERS = 8
+
+MAX_COMPLETION_TOKENS = 4000
+
+# Packing: short texts are sent together, up to this many prompt tokens per request
+DEFAULT_PACK_TOKENS = 1500
+PACK_MAX_ITEMS = 50
+
+
+def build_messages(text, source_language_code, target_language_code) -> list:
+    # Create the prompt
+    prompt = f"""Translate the following article from {language_name(source_language_code)} to {language_name(target_language_code)}. Return only the translation, without any additional text or comments.\n
+Original article:\n{text}
+"""
+
+    return [
+        {"role": "system", "content": "You are a bilingual translator."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def build_packed_messages(texts, source_language_code, target_language_code) -> tuple:
+    """
+    Messages and JSON schema to translate `texts` in a single request: the
+    texts are sent as a JSON object {"t0": ..., "t1": ...} and the answer must
+    be an object with the same keys.
+    """
+    items = {f"t{i}": text for i, text in enumerate(texts)}
+    prompt = f"""Translate each value of the following JSON object from {language_name(source_language_code)} to {language_name(target_language_code)}. Keep the HTML tags and the keys. Return a JSON object with the same keys and the translations as values, without any additional text or comments.\n
+Original texts:\n{json.dumps(items, ensure_ascii=False)}
+"""
+    schema = {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "translations",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {key: {"type": "string"} for key in items},
+                "required": list(items),
+                "additionalProperties": False,
+            },
+        },
+    }
+    messages = [
+        {"role": "system", "content": "You are a bilingual translator."},
+        {"role": "user", "content": prompt},
+    ]
+    return messages, schema
+
+
+def _governed_create(client, model_name, messages, **kwargs):
+    """
+    Call the OpenAI API through the shared rate governor (when enabled).
+    Returns the raw response and the number of retries: the governor's and
+    the client's own, read from the request headers.
+    """
+
+    def create():
+        return client.chat.completions.with_raw_response.create(
+            model=model_name,
+            messages=messages,
+            max_tokens=MAX_COMPLETION_TOKENS,
+            **kwargs,
+        )
+
+    governor = get_governor()
+    if governor is None:
+        raw_response, retries = create(), 0
+    else:
+        # The API counts max_tokens in the tokens of a request
+        tokens = MAX_COMPLETION_TOKENS + sum(
+            count_tokens(message["content"]) for message in messages
+        )
+        raw_response, retries = governor.call(model_name, tokens, create)
+    return raw_response, retries + int(
+        raw_response.http_request.headers.get("x-stainless-retry-count", 0)
+    )
+
+
+def _create_completion(client, model_name, messages, article_id, words, **kwargs):
+    # Call the OpenAI API (raw response: the headers give the retries and limits)
+    start = time.perf_counter()
+    try:
+        raw_response, retries = _governed_create(client, model_name, messages, **kwargs)
+        response = raw_response.parse()
+    except Exception as e:
+        record_call(
+            model_name,
+            article_id,
+            words=words,
+            latency=time.perf_counter() - start,
+            error=e,
+        )
+        raise
+    record_call(
+        model_name,
+        article_id,
+        usage=response.usage,
+        words=words,
+        latency=time.perf_counter() - start,
+        retries=retries,
+    )
+    return response
+
+
+def _stream_completion(client, model_name, messages, article_id, words, **kwargs):
+    # Streamed variant of _create_completion: yields the content deltas, the
+    # usage comes with the last event and the call is recorded once complete
+    start = time.perf_counter()
+    retries = 0
+    usage = None
+    try:
+        raw_response, retries = _governed_create(
+            client,
+            model_name,
+            messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs,
+        )
+        for event in raw_response.parse():
+            if event.usage is not None:
+                usage = event.usage
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+    except Exception as e:
+        record_call(
+            model_name,
+            article_id,
+            words=words,
+            latency=time.perf_counter() - start,
+            retries=retries,
+            error=e,
+        )
+        raise
+    record_call(
+        model_name,
+        article_id,
+        usage=usage,
+        words=words,
+        latency=time.perf_counter() - start,
+        retries=retries,
+    )
+
+
+def translate_chunk_with_openai(
     text,
     client,
     source_language_code,
     target_language_code,
     model_name,
     temperature,
+    cache=None,
+    article_id=None,
 ) -> str:
-    dict_languages = {
-        "en": "English",
-        "es": "Spanish",
-        "fr": "French",
-    }
+    # Reuse a translation we already paid for
+    words = count_words(text)
+    if cache is not None:
+        cache_key = make_cache_key(
+            text,
+            source_language_code,
+            target_language_code,
+            model_name,
+            temperature,
+            PROMPT_VERSION,
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            record_call(model_name, article_id, words=words, cache_hit=True)
+            return cached
 
-    # Create the prompt
-    prompt = f"""Translate the following article from {dict_languages[source_language_code]} to {dict_languages[target_language_code]}. Return only the translation, without any additional text or comments.\n
-Original article:\n{text}
-"""
+    response = _create_completion(
+        client,
+        model_name,
+        build_messages(text, source_language_code, target_language_code),
+        article_id,
+        words,
+        temperature=temperature,
+    )
+
+    translation = response.choices[0].message.content.strip()
+    if cache is not None:
+        cache.set(cache_key, translation)
+    return translation
+
+
+def stream_chunk_with_openai(
+    text,
+    client,
+    source_language_code,
+    target_language_code,
+    model_name,
+    temperature,
+    cache=None,
+    article_id=None,
+):
+    """
+    Streaming variant of translate_chunk_with_openai, yields the translation
+    piece by piece. The whitespace around `text` is kept, as with join_chunks.
+    """
+    leading = text[: len(text) - len(text.lstrip())]
+    trailing = text[len(text.rstrip()) :]
+    if not text.strip():
+        yield text
+        return
 
-    # Call the OpenAI API
-    response = client.chat.completions.create(
-        model=model_name,
-        messages=[
-            {"role": "system", "content": "You are a bilingual translator."},
-            {"role": "user", "content": prompt},
-        ],
-        max_tokens=4000,
+    words = count_words(text)
+    if cache is not None:
+        cache_key = make_cache_key(
+            text,
+            source_language_code,
+            target_language_code,
+            model_name,
+            temperature,
+            PROMPT_VERSION,
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            record_call(model_name, article_id, words=words, cache_hit=True)
+            yield leading + cached + trailing
+            return
+
+    if leading:
+        yield leading
+    parts = []
+    # Whitespace at the end of the answer is held back until more text comes
+    held_back = ""
+    for delta in _stream_completion(
+        client,
+        model_name,
+        build_messages(text, source_language_code, target_language_code),
+        article_id,
+        words,
         temperature=temperature,
+    ):
+        delta = held_back + delta
+        if not parts:
+            delta = delta.lstrip()
+        content = delta.rstrip()
+        held_back = delta[len(content) :]
+        if content:
+            parts.append(content)
+            yield content
+    if trailing:
+        yield trailing
+
+    if cache is not None:
+        cache.set(cache_key, "".join(parts))
+
+
+def translate_packed_with_openai(
+    texts,
+    client,
+    source_language_code,
+    target_language_code,
+    model_name,
+    temperature,
+    cache=None,
+    article_ids=None,
+) -> list:
+    """
+    Translate several short texts in a single request with JSON structured
+    output. Returns one (translation, error) tuple per text.
+
+    The answer is checked key by key: the texts missing from it (or not
+    translated as a string) are sent again one by one.
+    """
+    article_ids = list(article_ids) if article_ids is not None else [None] * len(texts)
+    results = [None] * len(texts)
+
+    # Reuse the translations we already paid for, pack the others
+    cache_keys = {}
+    pending = []
+    for position, text in enumerate(texts):
+        if cache is not None:
+            cache_keys[position] = make_cache_key(
+                text,
+                source_language_code,
+                target_language_code,
+                model_name,
+                temperature,
+                PROMPT_VERSION,
+            )
+            cached = cache.get(cache_keys[position])
+            if cached is not None:
+                record_call(
+                    model_name,
+                    article_ids[position],
+                    words=count_words(text),
+                    cache_hit=True,
+                )
+                results[position] = (cached, None)
+                continue
+        pending.append(position)
+
+    if len(pending) > 1:
+        messages, response_format = build_packed_messages(
+            [texts[position] for position in pending],
+            source_language_code,
+            target_language_code,
+        )
+        pack_ids = {article_ids[position] for position in pending}
+        try:
+            response = _create_completion(
+                client,
+                model_name,
+                messages,
+                pack_ids.pop() if len(pack_ids) == 1 else None,
+                sum(count_words(texts[position]) for position in pending),
+                temperature=temperature,
+                response_format=response_format,
+            )
+        except Exception as e:
+            for position in pending:
+                results[position] = (None, e)
+            return results
+        try:
+            translations = json.loads(response.choices[0].message.content)
+        except (TypeError, ValueError):
+            translations = {}
+        if not isinstance(translations, dict):
+            translations = {}
+        for i, position in enumerate(pending):
+            translation = translations.get(f"t{i}")
+            if isinstance(translation, str) and translation.strip():
+                results[position] = (translation.strip(), None)
+                if cache is not None:
+                    cache.set(cache_keys[position], translation.strip())
+
+    # Texts alone in their pack, or missing from the answer
+    for position, result in enumerate(results):
+        if result is not None:
+            continue
+        try:
+            results[position] = (
+                translate_chunk_with_openai(
+                    texts[position],
+                    client,
+                    source_language_code,
+                    target_language_code,
+                    model_name,
+                    temperature,
+                    cache=cache,
+                    article_id=article_ids[position],
+                ),
+                None,
+            )
+        except Exception as e:
+            results[position] = (None, e)
+    return results
+
+
+def pack_tasks(tasks, pack_tokens=DEFAULT_PACK_TOKENS, max_items=PACK_MAX_ITEMS):
+    """
+    Group the (language, position, chunk) tasks into requests: the chunks of
+    the same language are packed in order, up to `pack_tokens` prompt tokens
+    and `max_items` texts per request. Returns lists of task indices.
+    """
+    requests = []
+    open_packs = {}  # language -> (task indices, tokens)
+    for task_index, (target_language_code, _, chunk) in enumerate(tasks):
+        # Whitespace does not need the model, non-text cells are left as is
+        if not isinstance(chunk, str) or not chunk.strip():
+            requests.append([task_index])
+            continue
+        tokens = count_tokens(chunk)
+        indices, total = open_packs.get(target_language_code, ([], 0))
+        if indices and (total + tokens > pack_tokens or len(indices) >= max_items):
+            requests.append(indices)
+            indices, total = [], 0
+        indices.append(task_index)
+        open_packs[target_language_code] = (indices, total + tokens)
+    requests.extend(indices for indices, _ in open_packs.values() if indices)
+    return requests
+
+
+def merge_chunk_results(texts_chunks, chunk_results) -> list:
+    # Put the chunks of each text back together, in order
+    results = []
+    position = 0
+    for text_chunks in texts_chunks:
+        text_results = chunk_results[position : position + len(text_chunks)]
+        position += len(text_chunks)
+        errors = [error for _, error in text_results if error is not None]
+        if errors:
+            results.append((None, errors[0]))
+        elif len(text_chunks) == 1:
+            results.append(text_results[0])
+        else:
+            translated = [translation for translation, _ in text_results]
+            results.append((join_chunks(text_chunks, translated), None))
+    return results
+
+
+def translate_text_with_openai(
+    text,
+    client,
+    source_language_code,
+    target_language_code,
+    model_name,
+    temperature,
+    cache=None,
+    max_workers=DEFAULT_MAX_WORKERS,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    memory=None,
+    article_id=None,
+) -> str:
+    # Long articles are split into chunks translated in parallel. With a
+    # translation memory, the approved segments are reused and the reuse of
+    # the article is saved under `article_id` (see TranslationMemory.reuse_report)
+    ((translation, error),) = translate_texts(
+        [text],
+        client,
+        source_language_code,
+        target_language_code,
+        model_name,
+        temperature,
+        max_workers=max_workers,
+        cache=cache,
+        chunk_tokens=chunk_tokens,
+        ids=[article_id],
+        memory=memory,
+    )
+    if error is not None:
+        raise error
+    return translation
+
+
+def stream_text_with_openai(
+    text,
+    client,
+    source_language_code,
+    target_language_code,
+    model_name,
+    temperature,
+    cache=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    article_id=None,
+    output=None,
+):
+    """
+    Streaming variant of translate_text_with_openai: a generator of the
+    translation pieces, in order, as the model writes them.
+
+    The chunks are translated one after the other, so that the first words
+    come after a single round trip whatever the length of the article. Each
+    completed chunk is written and flushed to `output` (a text file) when
+    given, only the chunk in progress is held in memory.
+    """
+    for chunk in split_into_chunks(text, chunk_tokens):
+        translated = []
+        for piece in stream_chunk_with_openai(
+            chunk,
+            client,
+            source_language_code,
+            target_language_code,
+            model_name,
+            temperature,
+            cache=cache,
+            article_id=article_id,
+        ):
+            translated.append(piece)
+            yield piece
+        if output is not None:
+            output.write("".join(translated))
+            output.flush()
+
+
+def translate_texts(
+    texts,
+    client,
+    source_language_code,
+    target_language_code,
+    model_name,
+    temperature,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cache=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    progress=None,
+    ids=None,
+    pack_tokens=None,
+    memory=None,
+) -> list:
+    """
+    Translate a list of texts with at most `max_workers` OpenAI calls in flight.
+
+    Each text is split into chunks of at most `chunk_tokens` tokens and all the
+    chunks of all the texts share the same pool, so the latency of a run
+    depends on the chunk size rather than on the longest article.
+
+    Returns one (translation, error) tuple per text, in the order of `texts`.
+    A failed text gets (None, exception) and does not stop the others.
+    `progress(done, total)` is called after each chunk when given, and `ids`
+    (one per text) are recorded as article ids in the telemetry. With
+    `pack_tokens`, short texts are translated several per request, and
+    with a TranslationMemory the approved segments are not sent again.
+    """
+    return translate_texts_multi(
+        texts,
+        client,
+        source_language_code,
+        [target_language_code],
+        model_name,
+        temperature,
+        max_workers=max_workers,
+        cache=cache,
+        chunk_tokens=chunk_tokens,
+        progress=progress,
+        ids=ids,
+        pack_tokens=pack_tokens,
+        memory=memory,
+    )[target_language_code]
+
+
+def translate_texts_multi(
+    texts,
+    client,
+    source_language_code,
+    target_language_codes,
+    model_name,
+    temperature,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cache=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    progress=None,
+    ids=None,
+    text_languages=None,
+    pack_tokens=None,
+    memory=None,
+    on_result=None,
+) -> dict:
+    """
+    translate_texts into several target languages in a single run.
+
+    Each text is split into chunks once, then every (chunk, language) pair is
+    scheduled in the same pool. `text_languages` (one list of language codes
+    per text) restricts the languages of each text; the pairs left out get
+    (None, None). With `pack_tokens`, the chunks of a language are packed
+    into JSON requests of at most `pack_tokens` prompt tokens (see
+    translate_packed_with_openai).
+
+    With a TranslationMemory, the segments (paragraphs, HTML blocks) of a text
+    found exactly among the approved translations are reused, and the
+    segments between them are sent to the model in chunks of up to
+    `chunk_tokens`, like a text without match. The segments of the chunks
+    translated are stored when the translation keeps the same blocks. The
+    reuse of each (text, language) is saved in the memory.
+
+    `on_result(target_language_code, position, (translation, error))` is
+    called as soon as the last chunk of a text comes back, one call at a time.
+
+    Returns {target_language_code: [(translation, error), ...]}, each list in
+    the order of `texts`.
+    """
+    progress_lock = threading.Lock()
+    done = 0
+
+    def translate_request_with_progress(task_indices):
+        nonlocal done
+        if len(task_indices) == 1:
+            results = [translate_one(*tasks[task_indices[0]])]
+        else:
+            results = translate_pack([tasks[task_index] for task_index in task_indices])
+        with progress_lock:
+            done += len(task_indices)
+            if progress is not None:
+                progress(done, len(tasks))
+            if on_result is not None:
+                report_results(task_indices, results)
+        return results
+
+    def report_results(task_indices, results):
+        # Called with progress_lock held: report the texts now complete
+        for task_index, result in zip(task_indices, results):
+            target_language_code, position, i = slots[task_index]
+            key = (target_language_code, position)
+            chunk_results[key][i] = result
+            outstanding[key] -= 1
+            if not outstanding[key]:
+                report_text(key)
+
+    def report_text(key):
+        target_language_code, position = key
+        on_result(
+            target_language_code,
+            position,
+            merge_chunk_results([key_chunks[key]], chunk_results[key])[0],
+        )
+
+    def translate_pack(pack):
+        # The tasks of a pack all have the same language
+        return translate_packed_with_openai(
+            [chunk for _, _, chunk in pack],
+            client,
+            source_language_code,
+            pack[0][0],
+            model_name,
+            temperature,
+            cache=cache,
+            article_ids=[ids[position] for _, position, _ in pack],
+        )
+
+    def translate_one(target_language_code, position, chunk):
+        # Whitespace between blocks does not need the model
+        if isinstance(chunk, str) and not chunk.strip():
+            return chunk, None
+        try:
+            return (
+                translate_chunk_with_openai(
+                    chunk,
+                    client,
+                    source_language_code,
+                    target_language_code,
+                    model_name,
+                    temperature,
+                    cache=cache,
+                    article_id=ids[position],
+                ),
+                None,
+            )
+        except Exception as e:
+            return None, e
+
+    texts = list(texts)
+    texts_chunks = [
+        split_into_chunks(text, chunk_tokens) if isinstance(text, str) else [text]
+        for text in texts
+    ]
+    ids = list(ids) if ids is not None else [None] * len(texts)
+
+    # Chunks of every (language, text position). Texts come first so that all
+    # the languages of a text complete together (see on_result)
+    key_chunks = {
+        (target_language_code, position): text_chunks
+        for position, text_chunks in enumerate(texts_chunks)
+        for target_language_code in target_language_codes
+        if text_languages is None or target_language_code in text_languages[position]
+    }
+    chunk_results = {key: [None] * len(chunks) for key, chunks in key_chunks.items()}
+    reuse = {}
+    # Chunks of each (language, text position) taken from the memory
+    reused_chunks = {}
+    if memory is not None:
+        for key in chunk_results:
+            target_language_code, position = key
+            if not isinstance(texts[position], str):
+                continue
+            segments = split_into_segments(texts[position], chunk_tokens)
+            # Whitespace between blocks is never looked up
+            looked_up = [i for i, segment in enumerate(segments) if segment.strip()]
+            matches = [None] * len(segments)
+            for i, match in zip(
+                looked_up,
+                memory.lookup(
+                    [segments[i] for i in looked_up],
+                    source_language_code,
+                    target_language_code,
+                ),
+            ):
+                matches[i] = match
+            reuse[key] = segment_reuse(segments, matches)
+            if not any(matches):
+                continue
+            # The segments found are reused, the runs of segments between them
+            # go to the model in chunks, as a text without match
+            chunks = []
+            results = []
+            run = ""
+            for segment, match in zip([*segments, None], [*matches, None]):
+                if segment is not None and match is None:
+                    run += segment
+                    continue
+                if run.strip():
+                    run_chunks = split_into_chunks(run, chunk_tokens)
+                    chunks += run_chunks
+                    results += [None] * len(run_chunks)
+                elif run:
+                    chunks.append(run)
+                    results.append((run, None))
+                run = ""
+                if segment is not None:
+                    reused_chunks.setdefault(key, set()).add(len(chunks))
+                    chunks.append(segment)
+                    results.append((match, None))
+            key_chunks[key] = chunks
+            chunk_results[key] = results
+
+    # (language, text position, chunk) of every call, grouped by text and language
+    slots = [
+        (target_language_code, position, i)
+        for (target_language_code, position), results in chunk_results.items()
+        for i, result in enumerate(results)
+        if result is None
+    ]
+    tasks = [
+        (
+            target_language_code,
+            position,
+            key_chunks[(target_language_code, position)][i],
+        )
+        for target_language_code, position, i in slots
+    ]
+    outstanding = Counter(
+        (target_language_code, position) for target_language_code, position, _ in slots
     )
+    if on_result is not None:
+        # Texts found whole in the translation memory are already complete
+        for key in chunk_results:
+            if not outstanding[key]:
+                report_text(key)
 
-    return response.choices[0].message.content.strip()
+    if pack_tokens:
+        requests = pack_tasks(tasks, pack_tokens)
+    else:
+        requests = [[task_index] for task_index in range(len(tasks))]
+
+    if max_workers <= 1 or len(requests) <= 1:
+        request_results = [
+            translate_request_with_progress(request) for request in requests
+        ]
+    else:
+        # executor.map keeps the input order whatever the completion order
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(requests))
+        ) as executor:
+            request_results = list(
+                executor.map(in_current_run(translate_request_with_progress), requests)
+            )
+
+    task_results = [None] * len(tasks)
+    for request, results in zip(requests, request_results):
+        for task_index, result in zip(request, results):
+            task_results[task_index] = result
+
+    for (target_language_code, position, i), result in zip(slots, task_results):
+        chunk_results[(target_language_code, position)][i] = result
+
+    if memory is not None:
+        entries = []
+        for key, chunks in key_chunks.items():
+            target_language_code, position = key
+            for i, (chunk, (translation, error)) in enumerate(
+                zip(chunks, chunk_results[key])
+            ):
+                if (
+                    error is not None
+                    or not isinstance(chunk, str)
+                    or not chunk.strip()
+                    or i in reused_chunks.get(key, ())
+                ):
+                    continue
+                # Segments of the chunk translated, stored if the blocks line up
+                segments = split_into_segments(chunk, chunk_tokens)
+                translated = split_into_segments(translation, chunk_tokens)
+                if len(translated) != len(segments):
+                    continue
+                entries += [
+                    (
+                        segment,
+                        translated_segment.strip(),
+                        target_language_code,
+                        ids[position],
+                    )
+                    for segment, translated_segment in zip(segments, translated)
+                    if segment.strip()
+                ]
+        memory.add(entries, source_language_code, model_name)
+        # The fields of an article (title, content...) are reported together
+        article_reuse = {}
+        for (target_language_code, position), counts in reuse.items():
+            row = article_reuse.setdefault(
+                (ids[position], target_language_code),
+                {
+                    "article_id": ids[position],
+                    "target_language": target_language_code,
+                },
+            )
+            for name, value in counts.items():
+                row[name] = row.get(name, 0) + value
+        memory.record_reuse(list(article_reuse.values()))
+        for (target_language_code, position), counts in reuse.items():
+            if counts["reused_words"]:
+                record_call(
+                    model_name,
+                    ids[position],
+                    words=counts["reused_words"],
+                    cache_hit=True,
+                )
+
+    return {
+        target_language_code: [
+            merge_chunk_results(
+                [key_chunks[(target_language_code, position)]],
+                chunk_results[(target_language_code, position)],
+            )[0]
+            if (target_language_code, position) in chunk_results
+            else (None, None)
+            for position in range(len(texts))
+        ]
+        for target_language_code in target_language_codes
+    }
 
 
 def translate_csv_column(
@@ -42,16 +835,230 @@ def translate_csv_column(
     target_language_code,
     model_name,
     temperature,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cache=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    bulk=False,
+    progress=None,
+    pack=False,
+    memory=None,
+    checkpoint=None,
+) -> pd.DataFrame:
+    """
+    Add a `<column>_<target_language_code>` column for each of `column_names`.
+
+    With `bulk=True` the requests go through the OpenAI Batch API (half price,
+    results within 24h) instead of concurrent chat completions. With
+    `pack=True` short cells (titles...) are translated several per request.
+    `memory` reuses the approved translations of shared segments, and
+    `checkpoint` (a RunCheckpoint) saves each row as it completes.
+    """
+    df = translate_csv_column_multi(
+        df,
+        column_names,
+        client,
+        source_language_code,
+        [target_language_code],
+        model_name,
+        temperature,
+        max_workers=max_workers,
+        cache=cache,
+        chunk_tokens=chunk_tokens,
+        bulk=bulk,
+        progress=progress,
+        pack=pack,
+        memory=memory,
+        checkpoint=checkpoint,
+    )
+    df.attrs["translation_errors"] = {
+        (index, column_name): error
+        for (index, column_name, _), error in df.attrs["translation_errors"].items()
+    }
+    return df
+
+
+def translate_csv_column_multi(
+    df,
+    column_names,
+    client,
+    source_language_code,
+    target_language_codes,
+    model_name,
+    temperature,
+    max_workers=DEFAULT_MAX_WORKERS,
+    cache=None,
+    chunk_tokens=DEFAULT_CHUNK_TOKENS,
+    bulk=False,
+    progress=None,
+    row_languages=None,
+    pack=False,
+    memory=None,
+    checkpoint=None,
 ) -> pd.DataFrame:
-    for column_name in column_names:
-        df[column_name + "_" + target_language_code] = df[column_name].apply(
-            lambda x: translate_text_with_openai(
-                x,
+    """
+    Add a `<column>_<lang>` column for each of `column_names` and each of
+    `target_language_codes`, translating every (cell, language) pair in a
+    single run.
+
+    `row_languages` ({index: [lang, ...]}) restricts the languages of a row,
+    the other cells are left empty. `pack=True` packs the short cells of one
+    or several rows in JSON requests of up to DEFAULT_PACK_TOKENS tokens
+    (chat completions only, the Batch API path sends one request per chunk).
+    `memory` (a TranslationMemory, chat completions only too) reuses the
+    approved translations of the paragraphs shared with other articles.
+
+    With a RunCheckpoint, each row is saved as soon as all its cells are
+    translated, and the rows saved by a previous attempt of the run are
+    taken from the checkpoint instead of being translated again.
+
+    Failed cells are reported in df.attrs["translation_errors"] as
+    {(index, column, lang): message}.
+    """
+    row_ids = df["id"] if "id" in df.columns else pd.Series(df.index, df.index)
+
+    # Rows finished by a previous attempt of the run are not translated again
+    done_rows = {}
+    if checkpoint is not None:
+        done_rows = checkpoint.start(
+            len(df),
+            {
+                "columns": list(column_names),
+                "languages": list(target_language_codes),
+                "source_language": source_language_code,
+                "model": model_name,
+                "temperature": temperature,
+            },
+        )
+    pending = [index for index in df.index if str(row_ids[index]) not in done_rows]
+
+    # Every cell of every column is read and split once for all the languages,
+    # row by row so that rows complete (and are checkpointed) in order
+    cells = [(column_name, index) for index in pending for column_name in column_names]
+    texts = [df.at[index, column_name] for column_name, index in cells]
+    text_languages = None
+    if row_languages is not None:
+        text_languages = [
+            row_languages.get(index, target_language_codes) for _, index in cells
+        ]
+
+    # Cells left per row, a row is checkpointed when its last cell is back
+    row_cells = Counter(
+        index
+        for position, (_, index) in enumerate(cells)
+        for target_language_code in target_language_codes
+        if text_languages is None or target_language_code in text_languages[position]
+    )
+    row_values = {index: {} for index in pending}
+    failed_rows = set()
+
+    def checkpoint_result(target_language_code, position, result):
+        column_name, index = cells[position]
+        translation, error = result
+        row_values[index][f"{column_name}_{target_language_code}"] = translation
+        if error is not None:
+            failed_rows.add(index)
+        row_cells[index] -= 1
+        if not row_cells[index]:
+            checkpoint_row(index)
+
+    def checkpoint_row(index):
+        # Failed rows stay out of the checkpoint, to be translated on resume
+        values = row_values.pop(index)
+        if index in failed_rows:
+            checkpoint.add_failed()
+        else:
+            row_id = row_ids[index]
+            checkpoint.add(row_id.item() if hasattr(row_id, "item") else row_id, values)
+
+    try:
+        if checkpoint is not None:
+            # Rows without any language to translate are done already
+            for index in pending:
+                if not row_cells[index]:
+                    checkpoint_row(index)
+
+        if not cells:
+            results = {
+                target_language_code: []
+                for target_language_code in target_language_codes
+            }
+        elif bulk:
+            # Imported here as translation.batch builds on this module
+            from translation.batch import translate_texts_batch_multi
+
+            results = translate_texts_batch_multi(
+                texts,
                 client,
                 source_language_code,
-                target_language_code,
+                target_language_codes,
                 model_name,
                 temperature,
+                ids=[f"{row_ids[index]}|{column_name}" for column_name, index in cells],
+                cache=cache,
+                chunk_tokens=chunk_tokens,
+                text_languages=text_languages,
+                checkpoint=checkpoint,
             )
-        )
+            if checkpoint is not None:
+                for target_language_code, text_results in results.items():
+                    for position, result in enumerate(text_results):
+                        if (
+                            text_languages is None
+                            or target_language_code in text_languages[position]
+                        ):
+                            checkpoint_result(target_language_code, position, result)
+        else:
+            results = translate_texts_multi(
+                texts,
+                client,
+                source_language_code,
+                target_language_codes,
+                model_name,
+                temperature,
+                max_workers=max_workers,
+                cache=cache,
+                chunk_tokens=chunk_tokens,
+                progress=progress,
+                ids=[row_ids[index] for _, index in cells],
+                text_languages=text_languages,
+                pack_tokens=DEFAULT_PACK_TOKENS if pack else None,
+                memory=memory,
+                on_result=checkpoint_result if checkpoint is not None else None,
+            )
+    except BaseException as e:
+        if checkpoint is not None:
+            checkpoint.finish(
+                "interrupted" if isinstance(e, KeyboardInterrupt) else "failed"
+            )
+        raise
+    if checkpoint is not None:
+        checkpoint.finish("incomplete" if failed_rows else "completed")
+
+    # Failed cells are left empty and reported in df.attrs["translation_errors"]
+    errors = {}
+    df = df.copy()
+    for target_language_code in target_language_codes:
+        translations = {
+            column_name: pd.Series(None, index=df.index, dtype=object)
+            for column_name in column_names
+        }
+        for index in df.index.difference(pending, sort=False):
+            values = done_rows[str(row_ids[index])]
+            for column_name in column_names:
+                translations[column_name].at[index] = values.get(
+                    f"{column_name}_{target_language_code}"
+                )
+        for (column_name, index), (translation, error) in zip(
+            cells, results[target_language_code]
+        ):
+            translations[column_name].at[index] = translation
+            if error is not None:
+                errors[(index, column_name, target_language_code)] = str(error)
+                print(
+                    f"Error translating '{column_name}' of row {index} "
+                    f"to {target_language_code}: {error}"
+                )
+        for column_name in column_names:
+            df[column_name + "_" + target_language_code] = translations[column_name]
+    df.attrs["translation_errors"] = errors
     return df